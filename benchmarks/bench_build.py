@@ -0,0 +1,283 @@
+# time the stages of a build on synthetic content trees of 1k, 10k and 100k
+# pages, and compare the results against a saved baseline
+#
+#   python3 benchmarks/bench_build.py --save-baseline
+#   python3 benchmarks/bench_build.py --sizes 1000,10000
+#
+# every run after a baseline was saved is compared against it, and the run
+# exits with status 1 if a stage got slower by more than --tolerance. the
+# corpora are generated from a fixed seed, so every run renders the same pages
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from generate_page import generate_pages_recursive
+from markdown_blocks import (
+    BlockType,
+    block_lines_to_block_type,
+    iter_block_lines,
+    markdown_to_html_node,
+)
+from inline_markdown import text_to_textnodes
+
+BASELINE_PATH = ".build/benchmark-baseline.json"
+DEFAULT_SIZES = [1000, 10000, 100000]
+PAGES_PER_SECTION = 100
+CHUNK_SIZE = 1000
+STAGES = ["markdown_to_html_node", "text_to_textnodes", "to_html", "build"]
+
+TEMPLATE = """<!doctype html>
+<html>
+<head><title>{{ Title }}</title><link href="/index.css" rel="stylesheet"></head>
+<body><article>{{ Content }}</article></body>
+</html>
+"""
+
+WORDS = (
+    "the quick brown fox jumps over a lazy dog while elves sing of ancient "
+    "rings forged in fire beneath the mountain and hobbits travel far from home"
+).split()
+
+
+def make_words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def make_inline_paragraph(rng, page):
+    parts = []
+    for i in range(rng.randint(4, 8)):
+        kind = rng.randrange(6)
+        if kind == 0:
+            parts.append(f"**{make_words(rng, 2)}**")
+        elif kind == 1:
+            parts.append(f"_{make_words(rng, 2)}_")
+        elif kind == 2:
+            parts.append(f"`{rng.choice(WORDS)}()`")
+        elif kind == 3:
+            parts.append(f"[{make_words(rng, 2)}](/pages/{page}/{i})")
+        elif kind == 4:
+            parts.append(f"![{rng.choice(WORDS)}](/images/{page}-{i}.png)")
+        else:
+            parts.append(make_words(rng, 6))
+        parts.append(make_words(rng, rng.randint(3, 8)))
+    return " ".join(parts)
+
+
+def make_page(rng, page):
+    blocks = [f"# Page {page}: {make_words(rng, 3)}"]
+    for _ in range(rng.randint(6, 10)):
+        kind = rng.randrange(7)
+        if kind == 0:
+            blocks.append(f"{'#' * rng.randint(2, 4)} {make_words(rng, 4)}")
+        elif kind == 1:
+            code = "\n".join(make_words(rng, 5) for _ in range(rng.randint(2, 5)))
+            blocks.append(f"```\n{code}\n```")
+        elif kind == 2:
+            blocks.append(
+                "\n".join(
+                    f"> {make_inline_paragraph(rng, page)}"
+                    for _ in range(rng.randint(1, 3))
+                )
+            )
+        elif kind == 3:
+            blocks.append(
+                "\n".join(
+                    f"- {make_inline_paragraph(rng, page)}"
+                    for _ in range(rng.randint(2, 5))
+                )
+            )
+        elif kind == 4:
+            blocks.append(
+                "\n".join(
+                    f"{i}. {make_words(rng, 6)}"
+                    for i in range(1, rng.randint(2, 6) + 1)
+                )
+            )
+        else:
+            blocks.append(make_inline_paragraph(rng, page))
+    return "\n\n".join(blocks) + "\n"
+
+
+# the same seed and size always produce the same pages
+def make_corpus(pages, seed=0):
+    rng = random.Random(seed)
+    return [make_page(rng, page) for page in range(pages)]
+
+
+def write_corpus(corpus, root):
+    content_dir = os.path.join(root, "content")
+    for page, markdown in enumerate(corpus):
+        section_dir = os.path.join(content_dir, f"section-{page // PAGES_PER_SECTION}")
+        if page % PAGES_PER_SECTION == 0:
+            os.makedirs(section_dir)
+        with open(os.path.join(section_dir, f"page-{page}.md"), "w") as page_file:
+            page_file.write(markdown)
+
+    template_path = os.path.join(root, "template.html")
+    with open(template_path, "w") as template_file:
+        template_file.write(TEMPLATE)
+    return content_dir, template_path
+
+
+# the text of every paragraph in the corpus, as paragraph_to_html_node hands it
+# to text_to_textnodes
+def paragraph_texts(markdown):
+    return [
+        " ".join(lines)
+        for lines in iter_block_lines(markdown.split("\n"))
+        if block_lines_to_block_type(lines) == BlockType.PARAGRAPH
+    ]
+
+
+# the in-memory stages are timed a chunk of pages at a time, so the node trees
+# of a 100k page corpus never have to be held all at once
+def time_stages(corpus):
+    seconds = {"markdown_to_html_node": 0.0, "text_to_textnodes": 0.0, "to_html": 0.0}
+    for start in range(0, len(corpus), CHUNK_SIZE):
+        chunk = corpus[start : start + CHUNK_SIZE]
+
+        started = time.perf_counter()
+        nodes = [markdown_to_html_node(markdown) for markdown in chunk]
+        seconds["markdown_to_html_node"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        for node in nodes:
+            node.to_html()
+        seconds["to_html"] += time.perf_counter() - started
+
+        texts = [text for markdown in chunk for text in paragraph_texts(markdown)]
+        started = time.perf_counter()
+        for text in texts:
+            text_to_textnodes(text)
+        seconds["text_to_textnodes"] += time.perf_counter() - started
+    return seconds
+
+
+def time_build(corpus):
+    with tempfile.TemporaryDirectory() as root:
+        content_dir, template_path = write_corpus(corpus, root)
+        dest_dir = os.path.join(root, "docs")
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            started = time.perf_counter()
+            generate_pages_recursive(content_dir, template_path, dest_dir, "/")
+            return time.perf_counter() - started
+
+
+# best of repeat runs for every stage, in seconds
+def run_benchmark(pages, repeat):
+    corpus = make_corpus(pages)
+    results = {stage: float("inf") for stage in STAGES}
+    for _ in range(repeat):
+        for stage, seconds in time_stages(corpus).items():
+            results[stage] = min(results[stage], seconds)
+        results["build"] = min(results["build"], time_build(corpus))
+    return results
+
+
+def load_baseline(baseline_path):
+    if not os.path.exists(baseline_path):
+        return {}
+    with open(baseline_path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(results, baseline_path):
+    baseline_directory = os.path.dirname(baseline_path)
+    if baseline_directory:
+        os.makedirs(baseline_directory, exist_ok=True)
+    with open(baseline_path, "w") as baseline_file:
+        json.dump(results, baseline_file, indent=2)
+
+
+# returns the (size, stage, baseline, current) of every stage that got slower
+# than the baseline allows
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for size, stages in results.items():
+        for stage, seconds in stages.items():
+            baseline_seconds = baseline.get(size, {}).get(stage)
+            if baseline_seconds and seconds > baseline_seconds * (1 + tolerance):
+                regressions.append((size, stage, baseline_seconds, seconds))
+    return regressions
+
+
+def format_results(size, stages, baseline):
+    pages = int(size)
+    lines = [f"{pages} pages:"]
+    for stage in STAGES:
+        seconds = stages[stage]
+        line = f"  {stage:<22}{seconds:10.3f} s{seconds / pages * 1e6:10.1f} us/page"
+        baseline_seconds = baseline.get(size, {}).get(stage)
+        if baseline_seconds:
+            line += f"  ({(seconds / baseline_seconds - 1) * 100:+6.1f}% vs baseline)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the site build")
+    parser.add_argument(
+        "--sizes",
+        type=lambda sizes: [int(size) for size in sizes.split(",")],
+        default=DEFAULT_SIZES,
+        help="comma separated page counts (default: 1000,10000,100000)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="run every size N times and keep the best times (default: 1)",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE_PATH,
+        help=f"baseline to compare against (default: {BASELINE_PATH})",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store this run's results as the new baseline",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="fraction a stage may slow down before it counts as a regression (default: 0.2)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    baseline = load_baseline(args.baseline)
+
+    # json object keys are strings, so sizes are keyed the same way here
+    results = {}
+    for pages in args.sizes:
+        results[str(pages)] = run_benchmark(pages, args.repeat)
+        print(format_results(str(pages), results[str(pages)], baseline))
+
+    if args.save_baseline:
+        save_baseline({**baseline, **results}, args.baseline)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for size, stage, baseline_seconds, seconds in regressions:
+        print(
+            f"regression: {stage} on {size} pages took {seconds:.3f} s, "
+            f"baseline {baseline_seconds:.3f} s"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
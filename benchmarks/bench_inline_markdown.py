@@ -0,0 +1,65 @@
+# compare the single-scan inline tokenizer against the original chain of
+# split_nodes_* passes on long paragraphs full of links
+#
+#   python3 benchmarks/bench_inline_markdown.py
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from inline_markdown import (
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+from textnode import TextNode, TextType
+
+
+def chained_text_to_textnodes(text):
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+
+def make_paragraph(links):
+    sentence = (
+        "See [the docs {i}](https://example.com/docs/{i}) and [the api {i}](/api/{i}) "
+        "next to ![diagram {i}](/images/{i}.png), "
+    )
+    emphasis = "with **details**, the _short_ version in `cmd --{i}`. "
+    return "".join(
+        sentence.format(i=i) + (emphasis.format(i=i) if i % 10 == 9 else "")
+        for i in range(links)
+    )
+
+
+def main():
+    for links in [10, 100, 1000]:
+        paragraph = make_paragraph(links)
+        assert text_to_textnodes(paragraph) == chained_text_to_textnodes(paragraph)
+
+        number = max(5, 20000 // links)
+        chained = min(
+            timeit.repeat(
+                lambda: chained_text_to_textnodes(paragraph), number=number, repeat=7
+            )
+        )
+        single = min(
+            timeit.repeat(lambda: text_to_textnodes(paragraph), number=number, repeat=7)
+        )
+        print(
+            f"{links:5d} links ({len(paragraph):7d} chars): "
+            f"chained {chained / number * 1000:8.3f} ms, "
+            f"single scan {single / number * 1000:8.3f} ms, "
+            f"speed-up {chained / single:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
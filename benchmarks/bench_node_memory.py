@@ -0,0 +1,69 @@
+# measure the memory held by the TextNode and HTMLNode trees of a synthetic
+# corpus (see bench_build.py), with every page's tree kept alive at once as
+# when many pages are rendered in one process
+#
+#   python3 benchmarks/bench_node_memory.py --pages 10000
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bench_build import make_corpus, paragraph_texts
+from inline_markdown import text_to_textnodes
+from markdown_blocks import markdown_to_html_node
+
+
+def count_nodes(node):
+    count = 1
+    for child in node.children or ():
+        count += count_nodes(child)
+    return count
+
+
+# returns (bytes held, peak bytes, number of objects) for the result of
+# build(corpus)
+def measure(corpus, build, count):
+    gc.collect()
+    tracemalloc.start()
+    result = build(corpus)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, peak, count(result)
+
+
+def build_html_nodes(corpus):
+    return [markdown_to_html_node(markdown) for markdown in corpus]
+
+
+def build_text_nodes(corpus):
+    return [
+        text_to_textnodes(text)
+        for markdown in corpus
+        for text in paragraph_texts(markdown)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure node tree memory")
+    parser.add_argument("--pages", type=int, default=10000)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.pages)
+    for name, build, count in [
+        ("html nodes", build_html_nodes, lambda trees: sum(map(count_nodes, trees))),
+        ("text nodes", build_text_nodes, lambda runs: sum(map(len, runs))),
+    ]:
+        held, peak, nodes = measure(corpus, build, count)
+        print(
+            f"{name}: {nodes} nodes for {args.pages} pages, "
+            f"{held / 2**20:8.1f} MiB held, {peak / 2**20:8.1f} MiB peak, "
+            f"{held / nodes:6.1f} bytes/node"
+        )
+
+
+if __name__ == "__main__":
+    main()
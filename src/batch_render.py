@@ -0,0 +1,87 @@
+import collections
+import concurrent.futures
+import itertools
+
+from front_matter import split_front_matter
+from generate_page import render_page
+from markdown_blocks import markdown_to_html
+
+DEFAULT_CHUNK_SIZE = 64
+
+# per-process state of the worker processes, set up once by init_worker
+worker_template = None
+worker_block_cache = None
+
+
+# render many markdown documents, yielding their html in input order. without
+# a template each document renders to its bare html, with one it renders to a
+# full page titled by its front matter or h1. a BlockCache is shared by the whole
+# batch, so blocks repeated across documents are rendered once.
+#
+# with jobs > 1 the documents are sent to worker processes in chunks of
+# chunk_size, so the pickling and IPC cost is paid per chunk rather than per
+# document. each worker gets its own copy of the template and block cache;
+# blocks cached by the workers are not merged back into block_cache
+def render_batch(
+    documents,
+    template=None,
+    block_cache=None,
+    jobs=1,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+):
+    if jobs <= 1:
+        return (
+            render_document(markdown, template, block_cache) for markdown in documents
+        )
+    return render_batch_parallel(documents, template, block_cache, jobs, chunk_size)
+
+
+def render_document(markdown, template=None, block_cache=None):
+    if template is None:
+        _, markdown_body = split_front_matter(markdown)
+        return markdown_to_html(markdown_body, block_cache)
+    html, _ = render_page(markdown, template, block_cache)
+    return html
+
+
+# documents are read lazily and at most two chunks per worker are in flight,
+# so an unbounded iterable never has to be held in memory
+def render_batch_parallel(documents, template, block_cache, jobs, chunk_size):
+    executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=init_worker,
+        initargs=(template, block_cache),
+    )
+    pending = collections.deque()
+    try:
+        for chunk in iter_chunks(documents, chunk_size):
+            pending.append(executor.submit(render_chunk, chunk))
+            if len(pending) >= 2 * jobs:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        # also reached when the caller stops iterating early
+        executor.shutdown(cancel_futures=True)
+
+
+def iter_chunks(documents, chunk_size):
+    documents = iter(documents)
+    while True:
+        chunk = list(itertools.islice(documents, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def init_worker(template, block_cache):
+    global worker_template, worker_block_cache
+    worker_template = template
+    worker_block_cache = block_cache
+
+
+def render_chunk(documents):
+    return [
+        render_document(markdown, worker_template, worker_block_cache)
+        for markdown in documents
+    ]
@@ -0,0 +1,75 @@
+import hashlib
+from collections import OrderedDict
+
+from build_manifest import load_versioned_json, save_versioned_json
+
+# bump whenever a change to the renderer changes the html of a block, so
+# fragments cached by an older version are not reused
+BLOCK_CACHE_VERSION = 1
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+
+def block_cache_key(lines):
+    digest = hashlib.blake2b(digest_size=16)
+    for line in lines:
+        digest.update(line.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+# maps the hash of a block's markdown to its rendered html fragment. the least
+# recently used fragments are evicted once the cached html exceeds max_size
+# characters
+class BlockCache:
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        html = self.entries.get(key)
+        if html is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return html
+
+    def put(self, key, html):
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key))
+        self.entries[key] = html
+        self.size += len(html)
+
+        while self.size > self.max_size and self.entries:
+            _, evicted_html = self.entries.popitem(last=False)
+            self.size -= len(evicted_html)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"BlockCache({len(self.entries)} blocks, {self.size} of {self.max_size} characters)"
+
+
+def load_block_cache(cache_path, max_size=DEFAULT_MAX_SIZE):
+    block_cache = BlockCache(max_size)
+    data = load_versioned_json(cache_path, BLOCK_CACHE_VERSION)
+    if data is None:
+        return block_cache
+
+    # entries are stored least recently used first
+    for key, html in data.get("entries", []):
+        block_cache.put(key, html)
+    return block_cache
+
+
+def save_block_cache(block_cache, cache_path):
+    save_versioned_json(
+        {"entries": list(block_cache.entries.items())},
+        cache_path,
+        BLOCK_CACHE_VERSION,
+    )
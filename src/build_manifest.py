@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+
+# the manifest records, for every generated output file, the inputs it was
+# rendered from (source hash, template hash and basepath), so the next build
+# can tell which pages are already up to date. it also records which files in
+# the output tree were synced from the static directory
+def empty_manifest():
+    return {"version": MANIFEST_VERSION, "outputs": {}, "assets": {}}
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path):
+    manifest = load_versioned_json(manifest_path, MANIFEST_VERSION)
+    if manifest is None:
+        return empty_manifest()
+
+    manifest.setdefault("outputs", {})
+    manifest.setdefault("assets", {})
+    return manifest
+
+
+def save_manifest(manifest, manifest_path):
+    save_versioned_json(manifest, manifest_path, MANIFEST_VERSION, indent=2)
+
+
+# the build keeps its state between runs in json objects tagged with the
+# version of their format. a missing, corrupt or differently versioned file
+# loads as None, and the caller starts over from empty state: that only
+# costs the work the state would have saved
+def load_versioned_json(path, version):
+    try:
+        with open(path) as json_file:
+            data = json.load(json_file)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(data, dict) or data.get("version") != version:
+        return None
+    return data
+
+
+# save the dict data tagged with version. it is written to a temporary file
+# first and moved into place, so an interrupted build never leaves a
+# half-written file behind. with only_if_changed, a file that already holds
+# the same json is left alone. returns whether the file was written
+def save_versioned_json(data, path, version, indent=None, only_if_changed=False):
+    text = json.dumps({**data, "version": version}, indent=indent, sort_keys=True)
+    if only_if_changed:
+        try:
+            with open(path) as json_file:
+                if json_file.read() == text:
+                    return False
+        except OSError:
+            pass
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as json_file:
+        json_file.write(text)
+    os.replace(temp_path, path)
+    return True
+
+
+# delete an output file and any directories it leaves empty, stopping at the
+# root of the output tree
+def remove_output(dest_path, dest_dir_path):
+    os.remove(dest_path)
+
+    root = os.path.abspath(dest_dir_path)
+    directory = os.path.dirname(os.path.abspath(dest_path))
+    while (
+        directory != root and directory.startswith(root) and not os.listdir(directory)
+    ):
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
@@ -1,6 +1,20 @@
+import concurrent.futures
 import os
 import shutil
 
+from build_manifest import hash_file, load_manifest, remove_output, save_manifest
+
+try:
+    import fcntl
+except ImportError:
+    # not available on windows, reflinks fall back to copy_file_range or a copy
+    fcntl = None
+
+# ioctl request number for FICLONE from linux/fs.h
+FICLONE = 0x40049409
+
+LINK_MODES = ("copy", "hardlink", "reflink")
+
 
 # delete all the contents of the destination directory first
 # recursively copy all the files and subdirectories, nested files, etc
@@ -27,9 +41,270 @@ def copy_files(source, destination):
         source_file_path = os.path.join(source, source_file)
         if os.path.isfile(source_file_path):
             print(f"copying file from {source_file_path}")
-            destination_file_path = shutil.copy(source_file_path, destination)
+            destination_file_path = os.path.join(destination, source_file)
+            copy_file(source_file_path, destination_file_path)
             print(f"copied file to {destination_file_path}")
         else:
             print(f"{source_file_path} is a directory")
             destination_dir = os.path.join(destination, source_file)
             copy_files(source_file_path, destination_dir)
+
+
+# the concurrent counterpart of copy_files: walk source once, create every
+# destination directory up front, then copy the files on a pool of threads.
+# prints a single summary instead of a line per file and returns the number
+# of files and bytes copied
+def copy_files_parallel(source, destination, workers=None):
+    if not os.path.exists(source):
+        raise Exception(f"source path does not exist: {source}")
+
+    if os.path.exists(destination):
+        shutil.rmtree(destination)
+
+    directories, files = scan_tree(source, destination)
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        # consuming the results re-raises the first failed copy, if any
+        list(
+            executor.map(
+                copy_file,
+                [source_path for source_path, _, _ in files],
+                [destination_path for _, destination_path, _ in files],
+            )
+        )
+
+    copied_bytes = sum(size for _, _, size in files)
+    print(
+        f"copied {len(files)} files ({copied_bytes} bytes) from {source} to {destination}"
+    )
+    return len(files), copied_bytes
+
+
+# walk source with os.scandir and return the destination directories to
+# create and a (source path, destination path, size) entry for every file
+def scan_tree(source, destination):
+    directories = []
+    files = []
+    pending = [(source, destination)]
+    while pending:
+        source_dir, destination_dir = pending.pop()
+        directories.append(destination_dir)
+        with os.scandir(source_dir) as entries:
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                destination_path = os.path.join(destination_dir, entry.name)
+                if entry.is_dir():
+                    pending.append((entry.path, destination_path))
+                else:
+                    files.append((entry.path, destination_path, entry.stat().st_size))
+    return directories, files
+
+
+# bring destination up to date with source without deleting it first: only
+# files whose size or mtime differ (or, with compare_hash, whose content
+# differs) are transferred, and only files previously synced from source
+# that no longer exist there are deleted. everything else in destination,
+# such as generated pages, is left alone. returns the destination paths that
+# were transferred or deleted
+def sync_files(
+    source,
+    destination,
+    manifest_path,
+    link_mode="copy",
+    compare_hash=False,
+    workers=None,
+):
+    print(
+        f"syncing source directory {source} into destination directory {destination}..."
+    )
+
+    if not os.path.exists(source):
+        raise Exception(f"source path does not exist: {source}")
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"link mode must be one of {LINK_MODES}: {link_mode}")
+
+    manifest = load_manifest(manifest_path)
+    previous_assets = manifest["assets"]
+
+    _, files = scan_tree(source, destination)
+    assets = {
+        destination_file_path: source_file_path
+        for source_file_path, destination_file_path, _ in files
+    }
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        synced = executor.map(
+            lambda file: sync_file(file[0], file[1], link_mode, compare_hash),
+            files,
+        )
+        transferred = [
+            destination_file_path
+            for (_, destination_file_path, _), was_synced in zip(files, synced)
+            if was_synced
+        ]
+
+    removed = []
+    for destination_file_path in previous_assets:
+        if destination_file_path not in assets and os.path.exists(
+            destination_file_path
+        ):
+            print(f"removing orphaned file {destination_file_path}")
+            remove_output(destination_file_path, destination)
+            removed.append(destination_file_path)
+
+    manifest["assets"] = assets
+    save_manifest(manifest, manifest_path)
+
+    print(
+        f"synced {len(transferred)} of {len(assets)} files ({link_mode}), removed {len(removed)} orphaned files"
+    )
+    return transferred + removed
+
+
+# transfer one file if it is out of date, returns whether it was transferred
+def sync_file(source_path, destination_path, link_mode="copy", compare_hash=False):
+    if is_up_to_date(source_path, destination_path, compare_hash):
+        return False
+    transfer_file(source_path, destination_path, link_mode)
+    return True
+
+
+def is_up_to_date(source_path, destination_path, compare_hash=False):
+    try:
+        destination_stat = os.stat(destination_path)
+    except FileNotFoundError:
+        return False
+    source_stat = os.stat(source_path)
+
+    # a hardlink to the source is always up to date
+    if os.path.samestat(source_stat, destination_stat):
+        return True
+    if source_stat.st_size != destination_stat.st_size:
+        return False
+    if source_stat.st_mtime_ns == destination_stat.st_mtime_ns:
+        return True
+    if compare_hash and hash_file(source_path) == hash_file(destination_path):
+        # same content, so record the source mtime to skip hashing next time
+        shutil.copystat(source_path, destination_path)
+        return True
+    return False
+
+
+# put a copy of source_path at destination_path, sharing the data with the
+# source where link_mode and the filesystem allow it. the file is built next
+# to the destination and moved into place, so readers never see a partial file
+def transfer_file(source_path, destination_path, link_mode="copy"):
+    os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+    temp_path = f"{destination_path}.sync-tmp"
+
+    try:
+        if link_mode == "hardlink":
+            try:
+                os.link(source_path, temp_path)
+                os.replace(temp_path, destination_path)
+                return
+            except OSError:
+                # different filesystem or no hardlink support, copy instead
+                pass
+
+        if link_mode == "reflink":
+            try:
+                reflink_file(source_path, temp_path)
+                shutil.copystat(source_path, temp_path)
+                os.replace(temp_path, destination_path)
+                return
+            except OSError:
+                pass
+
+        # the mtime is kept, since it is what the next sync compares
+        copy_file(source_path, temp_path)
+        shutil.copystat(source_path, temp_path)
+        os.replace(temp_path, destination_path)
+    finally:
+        if os.path.lexists(temp_path):
+            os.remove(temp_path)
+
+
+# clone source_path into a new file at destination_path. FICLONE shares the
+# extents outright (btrfs, xfs); copy_file_range keeps the copy in the kernel
+# and lets filesystems that can share extents do so. raises OSError when
+# neither is supported
+def reflink_file(source_path, destination_path):
+    with (
+        open(source_path, "rb") as source_file,
+        open(destination_path, "wb") as destination_file,
+    ):
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+                return
+            except OSError:
+                pass
+
+        if not hasattr(os, "copy_file_range"):
+            raise OSError("reflinks are not supported on this platform")
+
+        remaining = os.fstat(source_file.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(
+                source_file.fileno(), destination_file.fileno(), remaining
+            )
+            if copied == 0:
+                break
+            remaining -= copied
+
+
+# copy the content and permission bits of source_path to destination_path,
+# like shutil.copy, but with the data moved by the kernel instead of read
+# into and written out of python buffers
+def copy_file(source_path, destination_path):
+    with (
+        open(source_path, "rb") as source_file,
+        open(destination_path, "wb") as destination_file,
+    ):
+        copy_file_contents(source_file, destination_file)
+    shutil.copymode(source_path, destination_path)
+
+
+# copy_file_range is tried first, as it lets the filesystem share extents or
+# copy on the server side; sendfile covers the kernels and filesystems it does
+# not. whatever is left after both failed is copied through a buffer
+def copy_file_contents(source_file, destination_file):
+    source_fd = source_file.fileno()
+    destination_fd = destination_file.fileno()
+    size = os.fstat(source_fd).st_size
+    offset = 0
+    for kernel_copy in KERNEL_COPIES:
+        try:
+            while offset < size:
+                copied = kernel_copy(source_fd, destination_fd, offset, size - offset)
+                if copied == 0:
+                    break
+                offset += copied
+        except OSError:
+            # not supported for this platform, kernel or pair of files
+            continue
+        if offset >= size:
+            return
+
+    source_file.seek(offset)
+    destination_file.seek(offset)
+    shutil.copyfileobj(source_file, destination_file)
+
+
+def copy_range(source_fd, destination_fd, offset, count):
+    return os.copy_file_range(source_fd, destination_fd, count, offset, offset)
+
+
+def send_range(source_fd, destination_fd, offset, count):
+    # sendfile writes at the current position of the destination
+    os.lseek(destination_fd, offset, os.SEEK_SET)
+    return os.sendfile(destination_fd, source_fd, offset, count)
+
+
+KERNEL_COPIES = [
+    kernel_copy
+    for kernel_copy, name in ((copy_range, "copy_file_range"), (send_range, "sendfile"))
+    if hasattr(os, name)
+]
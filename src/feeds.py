@@ -0,0 +1,165 @@
+import datetime
+import os
+from xml.sax.saxutils import escape, quoteattr
+
+from generate_page import write_text_file_if_changed
+
+SITEMAP_NAME = "sitemap.xml"
+FEED_NAME = "feed.xml"
+
+
+# the url a page is served at: basepath plus its path under dest_dir, with
+# index.html pages served as their directory. absolute when site_url is set
+def page_url(dest_path, dest_dir_path, basepath, site_url=""):
+    relative_path = os.path.relpath(dest_path, dest_dir_path).replace(os.sep, "/")
+    if relative_path == "index.html":
+        relative_path = ""
+    elif relative_path.endswith("/index.html"):
+        relative_path = relative_path[: -len("index.html")]
+    return site_url.rstrip("/") + basepath + relative_path
+
+
+# rfc 3339 timestamp for a front matter date. pages without a date fall back
+# to the modification time of their source, which needs a stat but no read
+def page_updated(metadata):
+    if metadata["date"] is not None:
+        updated = datetime.datetime.fromisoformat(metadata["date"])
+    else:
+        try:
+            mtime = os.stat(metadata["source"]).st_mtime
+        except OSError:
+            mtime = 0
+        updated = datetime.datetime.fromtimestamp(mtime, datetime.timezone.utc)
+    if updated.tzinfo is None:
+        updated = updated.replace(tzinfo=datetime.timezone.utc)
+    return updated.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def published_pages(page_index):
+    return sorted(
+        (dest_path, metadata)
+        for dest_path, metadata in page_index.items()
+        if not metadata["draft"]
+    )
+
+
+def build_sitemap(page_index, dest_dir_path, basepath, site_url=""):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for dest_path, metadata in published_pages(page_index):
+        url = page_url(dest_path, dest_dir_path, basepath, site_url)
+        lines.append(f"  <url><loc>{escape(url)}</loc>")
+        if metadata["date"] is not None:
+            lines.append(f"    <lastmod>{escape(metadata['date'])}</lastmod>")
+        lines.append("  </url>")
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+
+# group the published pages by the top level directory of dest_dir they are
+# in. a section's own index.html is its landing page, every page below it is
+# an entry of the section's feed
+def find_sections(page_index, dest_dir_path):
+    sections = {}
+    for dest_path, metadata in published_pages(page_index):
+        relative_path = os.path.relpath(dest_path, dest_dir_path)
+        parts = relative_path.split(os.sep)
+        if len(parts) < 2:
+            continue
+        section = sections.setdefault(parts[0], {"landing": None, "entries": []})
+        if len(parts) == 2 and parts[1] == "index.html":
+            section["landing"] = (dest_path, metadata)
+        else:
+            section["entries"].append((dest_path, metadata))
+    return {name: section for name, section in sections.items() if section["entries"]}
+
+
+# an atom feed of a section, newest entries first. the content of each entry
+# is cut from the page that was already rendered, so no markdown is re-read
+def build_feed(name, section, dest_dir_path, basepath, template, site_url=""):
+    feed_url = page_url(
+        os.path.join(dest_dir_path, name, FEED_NAME), dest_dir_path, basepath, site_url
+    )
+    if section["landing"] is not None:
+        section_url = page_url(section["landing"][0], dest_dir_path, basepath, site_url)
+        title = section["landing"][1]["title"]
+    else:
+        section_url = page_url(
+            os.path.join(dest_dir_path, name, "index.html"),
+            dest_dir_path,
+            basepath,
+            site_url,
+        )
+        title = name
+
+    entries = sorted(
+        (
+            (page_updated(metadata), dest_path, metadata)
+            for dest_path, metadata in section["entries"]
+        ),
+        reverse=True,
+    )
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"  <title>{escape(title)}</title>",
+        f"  <id>{escape(section_url)}</id>",
+        f"  <link href={quoteattr(section_url)}/>",
+        f'  <link rel="self" href={quoteattr(feed_url)}/>',
+        f"  <updated>{entries[0][0]}</updated>",
+    ]
+    for updated, dest_path, metadata in entries:
+        url = page_url(dest_path, dest_dir_path, basepath, site_url)
+        lines.append("  <entry>")
+        lines.append(f"    <title>{escape(metadata['title'])}</title>")
+        lines.append(f"    <id>{escape(url)}</id>")
+        lines.append(f"    <link href={quoteattr(url)}/>")
+        lines.append(f"    <updated>{updated}</updated>")
+        for tag in metadata["tags"]:
+            lines.append(f"    <category term={quoteattr(tag)}/>")
+        content = read_page_content(dest_path, template)
+        if content is not None:
+            lines.append(f'    <content type="html">{escape(content)}</content>')
+        lines.append("  </entry>")
+    lines.append("</feed>")
+    return "\n".join(lines) + "\n"
+
+
+def read_page_content(dest_path, template):
+    try:
+        with open(dest_path, encoding="utf-8") as page_file:
+            return template.extract_content(page_file.read())
+    except OSError:
+        return None
+
+
+# write dest_dir/sitemap.xml and a feed.xml for every section from the page
+# metadata index. files whose content did not change are left alone; the
+# ones that were written are appended to changed_files if it is given.
+# sitemaps and atom ids must be absolute urls, so site_url is required.
+# returns the paths of all the files it produced
+def write_feeds(
+    page_index, dest_dir_path, basepath, template, site_url, changed_files=None
+):
+    if not site_url:
+        raise ValueError("sitemap.xml and feeds need a site url for absolute urls")
+
+    outputs = {
+        os.path.join(dest_dir_path, SITEMAP_NAME): build_sitemap(
+            page_index, dest_dir_path, basepath, site_url
+        )
+    }
+    for name, section in find_sections(page_index, dest_dir_path).items():
+        outputs[os.path.join(dest_dir_path, name, FEED_NAME)] = build_feed(
+            name, section, dest_dir_path, basepath, template, site_url
+        )
+
+    for output_path, text in outputs.items():
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        if write_text_file_if_changed(output_path, text) and changed_files is not None:
+            changed_files.append(output_path)
+
+    print(f"wrote {SITEMAP_NAME} and {len(outputs) - 1} section feeds")
+    return sorted(outputs)
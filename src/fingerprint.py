@@ -0,0 +1,148 @@
+import concurrent.futures
+import hashlib
+import json
+import os
+
+from build_manifest import (
+    hash_file,
+    load_versioned_json,
+    remove_output,
+    save_versioned_json,
+)
+from copy_files import LINK_MODES, scan_tree, transfer_file
+
+ASSET_MANIFEST_VERSION = 1
+
+# hex digits of the content hash put into fingerprinted file names
+FINGERPRINT_LENGTH = 10
+
+
+# the asset manifest maps every file under the static directory, by its path
+# relative to it, to the fingerprinted file it was published as, along with
+# the content hash and the size and mtime it was hashed at. the next build
+# reuses the hash of a file whose size and mtime did not change
+def load_asset_manifest(manifest_path):
+    data = load_versioned_json(manifest_path, ASSET_MANIFEST_VERSION)
+    if data is None:
+        return {}
+    return data.get("assets", {})
+
+
+def save_asset_manifest(assets, manifest_path):
+    save_versioned_json(
+        {"assets": assets}, manifest_path, ASSET_MANIFEST_VERSION, indent=2
+    )
+
+
+# images/tom.png -> images/tom.0123456789.png
+def fingerprinted_name(relative_path, content_hash):
+    root, extension = os.path.splitext(relative_path)
+    return f"{root}.{content_hash[:FINGERPRINT_LENGTH]}{extension}"
+
+
+# the urls rewritten in the pages: the root-relative url of every static file
+# mapped to the url of its fingerprinted copy
+def fingerprinted_urls(assets):
+    urls = {}
+    for relative_path, entry in assets.items():
+        url = "/" + relative_path.replace(os.sep, "/")
+        urls[url] = "/" + entry["file"].replace(os.sep, "/")
+    return urls
+
+
+# pages link to every static file they use, so they are re-rendered whenever
+# any fingerprint changes
+def hash_asset_urls(asset_urls):
+    return hashlib.sha256(json.dumps(asset_urls, sort_keys=True).encode()).hexdigest()
+
+
+# publish every file of source into destination under a name carrying its
+# content hash, so it can be served with long lived cache headers. a file
+# whose fingerprinted name already exists in destination is up to date and
+# is not copied again; fingerprinted files of earlier builds whose static
+# file changed or is gone are deleted. the files copied and deleted are
+# appended to changed_files if it is given. returns the asset urls to rewrite
+def fingerprint_assets(
+    source,
+    destination,
+    manifest_path,
+    link_mode="copy",
+    workers=None,
+    changed_files=None,
+):
+    print(
+        f"fingerprinting source directory {source} into destination directory {destination}..."
+    )
+
+    if not os.path.exists(source):
+        raise Exception(f"source path does not exist: {source}")
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"link mode must be one of {LINK_MODES}: {link_mode}")
+
+    previous_assets = load_asset_manifest(manifest_path)
+
+    _, files = scan_tree(source, destination)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(
+            executor.map(
+                lambda file: fingerprint_asset(
+                    file[0], source, destination, previous_assets, link_mode
+                ),
+                files,
+            )
+        )
+
+    assets = {relative_path: entry for relative_path, entry, _, _ in results}
+    hashed = sum(1 for _, _, was_hashed, _ in results if was_hashed)
+    copied = 0
+    for _, entry, _, was_copied in results:
+        if was_copied:
+            copied += 1
+            if changed_files is not None:
+                changed_files.append(os.path.join(destination, entry["file"]))
+
+    published = {entry["file"] for entry in assets.values()}
+    removed = 0
+    for entry in previous_assets.values():
+        stale_path = os.path.join(destination, entry["file"])
+        if entry["file"] not in published and os.path.exists(stale_path):
+            remove_output(stale_path, destination)
+            removed += 1
+            if changed_files is not None:
+                changed_files.append(stale_path)
+
+    save_asset_manifest(assets, manifest_path)
+
+    print(
+        f"fingerprinted {len(assets)} files: hashed {hashed}, copied {copied}, removed {removed} stale files"
+    )
+    return fingerprinted_urls(assets)
+
+
+# returns the manifest entry of one static file and whether it had to be
+# hashed and copied
+def fingerprint_asset(source_path, source, destination, previous_assets, link_mode):
+    relative_path = os.path.relpath(source_path, source)
+    source_stat = os.stat(source_path)
+
+    entry = previous_assets.get(relative_path)
+    hashed = (
+        entry is None
+        or entry["size"] != source_stat.st_size
+        or entry["mtime_ns"] != source_stat.st_mtime_ns
+    )
+    if hashed:
+        content_hash = hash_file(source_path)
+        entry = {
+            "file": fingerprinted_name(relative_path, content_hash),
+            "hash": content_hash,
+            "size": source_stat.st_size,
+            "mtime_ns": source_stat.st_mtime_ns,
+        }
+
+    # the name is derived from the content, so an existing file is current
+    destination_path = os.path.join(destination, entry["file"])
+    copied = not os.path.exists(destination_path)
+    if copied:
+        transfer_file(source_path, destination_path, link_mode)
+    return relative_path, entry, hashed, copied
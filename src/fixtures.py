@@ -0,0 +1,26 @@
+import os
+
+# file helpers shared by the tests. the module name does not match test*.py,
+# so unittest discovery does not collect it
+
+
+def write_file(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(text)
+
+
+def read_file(path):
+    with open(path) as file:
+        return file.read()
+
+
+# the content of every file under root, as bytes, keyed by relative path
+def read_tree(root):
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, "rb") as file:
+                files[os.path.relpath(path, root)] = file.read()
+    return files
@@ -0,0 +1,116 @@
+import datetime
+
+FRONT_MATTER_DELIMITER = "---"
+
+# the fields every page has in the metadata index, with their defaults. the
+# title defaults to the page's first "# " heading
+FRONT_MATTER_DEFAULTS = {
+    "title": None,
+    "date": None,
+    "tags": [],
+    "draft": False,
+    "layout": None,
+}
+
+TRUE_VALUES = ("true", "yes", "on")
+FALSE_VALUES = ("false", "no", "off")
+
+
+# split a document into its front matter and the markdown after it. front
+# matter is a block of "key: value" lines between two "---" lines at the very
+# top of the document:
+#
+#   ---
+#   title: Fellowship
+#   date: 2024-03-01
+#   tags: [tolkien, books]
+#   draft: false
+#   layout: post
+#   ---
+#
+# returns (metadata, body), with only the keys the document sets
+def split_front_matter(markdown):
+    if not markdown.startswith(FRONT_MATTER_DELIMITER + "\n"):
+        return {}, markdown
+
+    start = len(FRONT_MATTER_DELIMITER) + 1
+    end = markdown.find(f"\n{FRONT_MATTER_DELIMITER}\n", start - 1)
+    if end == -1:
+        if not markdown.endswith(f"\n{FRONT_MATTER_DELIMITER}"):
+            raise Exception("front matter is not closed")
+        end = len(markdown) - len(FRONT_MATTER_DELIMITER) - 1
+
+    front_matter_lines = markdown[start:end].split("\n") if end >= start else []
+    body = markdown[end + len(FRONT_MATTER_DELIMITER) + 2 :]
+    return parse_front_matter(front_matter_lines), body
+
+
+# the line-wise equivalent of split_front_matter for documents read a line at
+# a time. consumes the front matter from lines and returns (metadata, number of
+# lines it took up)
+def read_front_matter_lines(lines):
+    lines = iter(lines)
+    if next(lines, None) != FRONT_MATTER_DELIMITER:
+        return {}, 0
+
+    front_matter_lines = []
+    for line in lines:
+        if line == FRONT_MATTER_DELIMITER:
+            return (
+                parse_front_matter(front_matter_lines),
+                len(front_matter_lines) + 2,
+            )
+        front_matter_lines.append(line)
+    raise Exception("front matter is not closed")
+
+
+def parse_front_matter(lines):
+    metadata = {}
+    for line in lines:
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        key, separator, value = line.partition(":")
+        if not separator:
+            raise Exception(f"invalid front matter line: {line}")
+        key = key.strip()
+        metadata[key] = parse_front_matter_value(key, value.strip())
+    return metadata
+
+
+def parse_front_matter_value(key, value):
+    if key == "tags":
+        if value.startswith("[") and value.endswith("]"):
+            value = value[1:-1]
+        return [tag.strip() for tag in value.split(",") if tag.strip()]
+
+    if key == "draft":
+        if value.lower() in TRUE_VALUES:
+            return True
+        if value.lower() in FALSE_VALUES:
+            return False
+        raise Exception(f"invalid draft value in front matter: {value}")
+
+    value = unquote(value)
+    if key == "date":
+        try:
+            datetime.datetime.fromisoformat(value)
+        except ValueError:
+            raise Exception(f"invalid date in front matter: {value}")
+    return value
+
+
+def unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+# the metadata index entry of a page: every front matter field with its
+# default filled in, plus where the page came from
+def page_metadata(source_path, metadata):
+    entry = {"source": str(source_path)}
+    for key, default in FRONT_MATTER_DEFAULTS.items():
+        entry[key] = metadata.get(key, default)
+    for key, value in metadata.items():
+        entry.setdefault(key, value)
+    return entry
@@ -1,48 +1,228 @@
+import concurrent.futures
+import filecmp
 import os
 import pathlib
+import queue
+import itertools
+import mmap
+import threading
 
-from markdown_blocks import markdown_to_html_node
+from build_manifest import hash_file, load_manifest, remove_output, save_manifest
+from fingerprint import hash_asset_urls
+from front_matter import page_metadata, read_front_matter_lines, split_front_matter
+from markdown_blocks import (
+    block_title,
+    iter_block_lines,
+    markdown_to_html,
+    write_markdown_html,
+)
+from template import load_template
+
+# markdown files larger than this are rendered block by block straight into
+# the output file instead of being read and rendered in memory
+STREAMING_THRESHOLD = 8 * 1024 * 1024
+
+# pages read ahead of, and rendered pages waiting behind, the render stage of
+# a pipelined build
+PIPELINE_QUEUE_SIZE = 32
+
+# the amount of a memory mapped markdown file decoded at once; every chunk is
+# extended to the end of the block it stops in
+MAPPED_CHUNK_SIZE = 64 * 1024
 
 
 def extract_title(markdown):
-    lines = markdown.split("\n")
+    return extract_title_from_lines(markdown.split("\n"))
 
-    for line in lines:
-        if line.startswith("# "):
-            return line[2:]
+
+# the same rule the render pass applies, so a page gets the same title
+# whether it is rendered in memory or streamed
+def extract_title_from_lines(lines):
+    for block_lines in iter_block_lines(lines):
+        title = block_title(block_lines)
+        if title is not None:
+            return title
 
     raise Exception("no title found")
 
 
-def generate_page(from_path, template_path, dest_path, basepath):
+# template is the compiled template_path; builds compile it once and pass it
+# in so it is not re-read for every page. with a block_cache, blocks rendered
+# by earlier pages or builds are reused. with write_if_changed, an existing
+# page with the same html is left untouched (keeping its mtime). returns
+# whether dest_path was written and the page's metadata index entry
+def generate_page(
+    from_path,
+    template_path,
+    dest_path,
+    basepath,
+    template=None,
+    block_cache=None,
+    write_if_changed=False,
+):
     print(f"Generating page from {from_path} to {dest_path} using {template_path}")
 
-    markdown_file = open(from_path)
-    markdown_doc = markdown_file.read()
-
-    template_file = open(template_path)
-    template_doc = template_file.read()
+    if os.path.getsize(from_path) > STREAMING_THRESHOLD:
+        return generate_page_streaming(
+            from_path,
+            template_path,
+            dest_path,
+            basepath,
+            template,
+            block_cache,
+            write_if_changed,
+        )
 
-    markdown_html_node = markdown_to_html_node(markdown_doc)
-    markdown_html = markdown_html_node.to_html()
+    markdown_doc = read_text_file(from_path)
 
-    page_title = extract_title(markdown_doc)
-    html_doc_with_title = template_doc.replace("{{ Title }}", page_title)
-    html_doc = html_doc_with_title.replace("{{ Content }}", markdown_html)
+    if template is None:
+        template = load_template(template_path, basepath)
 
-    html_doc_with_href = html_doc.replace('href="/', f'href="' + basepath)
-    html_doc_with_src = html_doc_with_href.replace('src="/', f'href="' + basepath)
+    html_doc, metadata = render_page(markdown_doc, template, block_cache)
 
     dest_directory = os.path.dirname(dest_path)
 
-    if not os.path.exists(dest_directory):
-        os.makedirs(dest_directory)
+    # exist_ok, since parallel workers may race to create the same directory
+    os.makedirs(dest_directory, exist_ok=True)
+
+    if write_if_changed:
+        written = write_text_file_if_changed(dest_path, html_doc)
+    else:
+        write_text_file(dest_path, html_doc)
+        written = True
+    return written, page_metadata(from_path, metadata)
+
+
+# render a markdown document, front matter and all, into a full page. the
+# title comes from the front matter or else is picked up by the render pass
+# itself. returns the html and the front matter with the title filled in
+def render_page(markdown_doc, template, block_cache=None):
+    metadata, markdown_body = split_front_matter(markdown_doc)
+    markdown_html = markdown_to_html(markdown_body, block_cache, metadata)
+    if metadata.get("title") is None:
+        raise Exception("no title found")
+    return template.render(metadata["title"], markdown_html), metadata
+
+
+def read_text_file(path):
+    with open(path) as file:
+        return file.read()
+
 
-    with open(dest_path, "w") as destination_file:
-        destination_file.write(html_doc_with_src)
+# pages are written as utf-8 with the newlines untranslated, the same bytes
+# write_text_file_if_changed writes, whatever the platform or locale, so a
+# page written by either compares equal to an unchanged render
+def write_text_file(path, text):
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        file.write(text)
+
+
+# write text to path unless the file already holds exactly that text. sizes
+# are compared first, so most changed pages are detected without reading the
+# old file. the new file is written next to path and moved over it with
+# os.replace, so readers never see a partial page. returns whether it wrote
+def write_text_file_if_changed(path, text):
+    data = text.encode()
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as file:
+                if file.read() == data:
+                    return False
+    except FileNotFoundError:
+        pass
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
+    return True
+
+
+# render a page without holding the markdown document, its node tree or the
+# html in memory: one pass over the file finds the title (it is needed before
+# any content is written), a second renders and writes one block at a time
+def generate_page_streaming(
+    from_path,
+    template_path,
+    dest_path,
+    basepath,
+    template=None,
+    block_cache=None,
+    write_if_changed=False,
+):
+    if template is None:
+        template = load_template(template_path, basepath)
+
+    metadata, front_matter_size = read_front_matter_lines(iter_mapped_lines(from_path))
+    if metadata.get("title") is None:
+        metadata["title"] = extract_title_from_lines(
+            itertools.islice(iter_mapped_lines(from_path), front_matter_size, None)
+        )
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+    # the page is too large to hold for the comparison, so it is written to a
+    # temp file and compared with the existing page on disk
+    output_path = f"{dest_path}.tmp" if write_if_changed else dest_path
+    with open(output_path, "w", encoding="utf-8", newline="") as destination_file:
+        markdown_lines = itertools.islice(
+            iter_mapped_lines(from_path), front_matter_size, None
+        )
+        template.write(
+            destination_file,
+            metadata["title"],
+            lambda out: write_markdown_html(markdown_lines, out, block_cache),
+        )
+
+    written = True
+    if write_if_changed:
+        if os.path.exists(dest_path) and filecmp.cmp(output_path, dest_path, False):
+            os.remove(output_path)
+            written = False
+        else:
+            os.replace(output_path, dest_path)
+    return written, page_metadata(from_path, metadata)
 
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
+# the lines of a utf-8 text file, without reading or decoding it as a whole:
+# the file is mapped into memory, the blank lines that end blocks are found in
+# the mapped bytes, and only a run of whole blocks at a time is decoded and
+# split. line endings are translated like a text mode read does. files with
+# windows line endings have no "\n\n" to split at and are decoded in one piece
+def iter_mapped_lines(path):
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            # empty files cannot be mapped
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            start = 0
+            while start < size:
+                # each chunk ends on the first newline of a blank line, so the
+                # next one starts with the empty line between the blocks
+                end = mapped.find(b"\n\n", min(start + MAPPED_CHUNK_SIZE, size))
+                end = size if end == -1 else end + 1
+                chunk = mapped[start:end].decode()
+                start = end
+                if "\r" in chunk:
+                    chunk = chunk.replace("\r\n", "\n").replace("\r", "\n")
+                if chunk.endswith("\n"):
+                    chunk = chunk[:-1]
+                yield from chunk.split("\n")
+
+
+def generate_pages_recursive(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    basepath,
+    template=None,
+    block_cache=None,
+    changed_files=None,
+    page_index=None,
+    asset_urls=None,
+    precompressor=None,
+):
     print(
         f"copying contents of source directory {dir_path_content} into destination directory {dest_dir_path}..."
     )
@@ -50,6 +230,9 @@ def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, bas
     if not os.path.exists(dir_path_content):
         raise Exception(f"source path does not exist: {dir_path_content}")
 
+    if template is None:
+        template = load_template(template_path, basepath, asset_urls)
+
     content_files = os.listdir(dir_path_content)
     print(f"files in {dir_path_content} directory: {content_files}")
 
@@ -61,10 +244,436 @@ def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, bas
                 ".html"
             )
             print(f"copying file from {content_file_path}")
-            generate_page(content_file_path, template_path, dest_file_path, basepath)
+            written, metadata = generate_page(
+                content_file_path,
+                template_path,
+                dest_file_path,
+                basepath,
+                template,
+                block_cache,
+                changed_files is not None,
+            )
+            record_page(
+                dest_file_path,
+                written,
+                metadata,
+                changed_files,
+                page_index,
+                precompressor,
+            )
             print(f"copied file to {dest_file_path}")
         else:
             print(f"{content_file} is a directory")
             generate_pages_recursive(
-                content_file_path, template_path, dest_file_path, basepath
+                content_file_path,
+                template_path,
+                dest_file_path,
+                basepath,
+                template,
+                block_cache,
+                changed_files,
+                page_index,
+                precompressor=precompressor,
             )
+
+
+# note a generated page in the optional build results: the list of pages
+# that were actually written, the metadata index and the precompressor
+def record_page(
+    dest_file_path, written, metadata, changed_files, page_index, precompressor=None
+):
+    if written and changed_files is not None:
+        changed_files.append(str(dest_file_path))
+    if page_index is not None:
+        page_index[str(dest_file_path)] = metadata
+    if precompressor is not None:
+        precompressor.submit(dest_file_path)
+
+
+# walk the content tree and return every markdown file paired with the html
+# file it should be rendered to, in a stable order
+def find_pages(dir_path_content, dest_dir_path):
+    if not os.path.exists(dir_path_content):
+        raise Exception(f"source path does not exist: {dir_path_content}")
+
+    pages = []
+    for content_file in sorted(os.listdir(dir_path_content)):
+        content_file_path = pathlib.Path(dir_path_content, content_file)
+        dest_file_path = pathlib.Path(dest_dir_path, content_file)
+        if os.path.isfile(content_file_path):
+            if str(content_file_path).endswith(".md"):
+                pages.append((content_file_path, dest_file_path.with_suffix(".html")))
+        else:
+            pages.extend(find_pages(content_file_path, dest_file_path))
+
+    return pages
+
+
+# discover every page up front, then render them on a pool of worker processes
+def generate_pages_parallel(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    basepath,
+    jobs,
+    changed_files=None,
+    page_index=None,
+    asset_urls=None,
+    precompressor=None,
+):
+    print(
+        f"generating pages from {dir_path_content} into {dest_dir_path} with {jobs} workers..."
+    )
+
+    pages = find_pages(dir_path_content, dest_dir_path)
+    render_pages(
+        pages,
+        template_path,
+        basepath,
+        jobs,
+        changed_files=changed_files,
+        page_index=page_index,
+        asset_urls=asset_urls,
+        precompressor=precompressor,
+    )
+
+    print(f"rendered {len(pages)} pages")
+
+
+# discover every page up front, then render them with reading and writing
+# overlapped with rendering
+def generate_pages_pipelined(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    basepath,
+    block_cache=None,
+    changed_files=None,
+    page_index=None,
+    asset_urls=None,
+    precompressor=None,
+):
+    print(f"generating pages from {dir_path_content} into {dest_dir_path}...")
+
+    pages = find_pages(dir_path_content, dest_dir_path)
+    render_pages(
+        pages,
+        template_path,
+        basepath,
+        block_cache=block_cache,
+        pipeline=True,
+        changed_files=changed_files,
+        page_index=page_index,
+        asset_urls=asset_urls,
+        precompressor=precompressor,
+    )
+
+    print(f"rendered {len(pages)} pages")
+
+
+# render (content path, destination path) pairs, one at a time when jobs is 1,
+# otherwise on a process pool. a failing page does not stop the other workers;
+# every failure is reported and the build fails once all pages are done. the
+# block cache lives in this process, so only serial rendering uses it. with
+# pipeline, serial rendering overlaps with reading and writing on threads.
+# given a changed_files list, pages whose html did not change are not
+# rewritten and the destination of every page that was is appended to it.
+# given a page_index dict, every page's metadata is stored in it. given
+# asset_urls, links to static files point at their fingerprinted names. given
+# a precompressor, every page is handed to it once it is written
+def render_pages(
+    pages,
+    template_path,
+    basepath,
+    jobs=1,
+    block_cache=None,
+    pipeline=False,
+    changed_files=None,
+    page_index=None,
+    asset_urls=None,
+    precompressor=None,
+):
+    if not pages:
+        return
+
+    template = load_template(template_path, basepath, asset_urls)
+    write_if_changed = changed_files is not None
+
+    if jobs <= 1 and pipeline:
+        failures = render_pages_pipelined(
+            pages,
+            template_path,
+            basepath,
+            template,
+            block_cache,
+            changed_files,
+            page_index,
+            precompressor,
+        )
+        if failures:
+            raise Exception(f"{len(failures)} of {len(pages)} pages failed to generate")
+        return
+
+    if jobs <= 1:
+        for content_file_path, dest_file_path in pages:
+            written, metadata = generate_page(
+                content_file_path,
+                template_path,
+                dest_file_path,
+                basepath,
+                template,
+                block_cache,
+                write_if_changed,
+            )
+            record_page(
+                dest_file_path,
+                written,
+                metadata,
+                changed_files,
+                page_index,
+                precompressor,
+            )
+        return
+
+    failures = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(
+                generate_page,
+                content_file_path,
+                template_path,
+                dest_file_path,
+                basepath,
+                template,
+                None,
+                write_if_changed,
+            ): (content_file_path, dest_file_path)
+            for content_file_path, dest_file_path in pages
+        }
+        for future in concurrent.futures.as_completed(futures):
+            content_file_path, dest_file_path = futures[future]
+            error = future.exception()
+            if error is not None:
+                print(f"failed to generate page from {content_file_path}: {error}")
+                failures.append(content_file_path)
+            else:
+                written, metadata = future.result()
+                record_page(
+                    dest_file_path,
+                    written,
+                    metadata,
+                    changed_files,
+                    page_index,
+                    precompressor,
+                )
+
+    if failures:
+        raise Exception(f"{len(failures)} of {len(pages)} pages failed to generate")
+
+
+# a three stage pipeline: a reader thread loads markdown files, this thread
+# renders them and a writer thread writes the pages out. bounded queues between
+# the stages let disk latency on one page hide behind rendering another while
+# keeping only a few pages in memory. rendering stays on one thread, since it
+# holds the GIL and shares the block cache. returns the pages that failed
+def render_pages_pipelined(
+    pages,
+    template_path,
+    basepath,
+    template,
+    block_cache=None,
+    changed_files=None,
+    page_index=None,
+    precompressor=None,
+):
+    read_queue = queue.Queue(PIPELINE_QUEUE_SIZE)
+    write_queue = queue.Queue(PIPELINE_QUEUE_SIZE)
+    failures = []
+    stop = threading.Event()
+
+    def fail(content_file_path, error):
+        print(f"failed to generate page from {content_file_path}: {error}")
+        failures.append(content_file_path)
+
+    def read_pages():
+        try:
+            for content_file_path, dest_file_path in pages:
+                if stop.is_set():
+                    break
+                try:
+                    # very large pages are streamed by the render stage instead
+                    if os.path.getsize(content_file_path) > STREAMING_THRESHOLD:
+                        markdown_doc = None
+                    else:
+                        markdown_doc = read_text_file(content_file_path)
+                except Exception as error:
+                    fail(content_file_path, error)
+                    continue
+                read_queue.put((content_file_path, dest_file_path, markdown_doc))
+        finally:
+            read_queue.put(None)
+
+    def write_pages():
+        created_directories = set()
+        while True:
+            item = write_queue.get()
+            if item is None:
+                return
+            content_file_path, dest_file_path, html_doc = item
+            try:
+                dest_directory = os.path.dirname(dest_file_path)
+                if dest_directory not in created_directories:
+                    os.makedirs(dest_directory, exist_ok=True)
+                    created_directories.add(dest_directory)
+                if changed_files is None:
+                    write_text_file(dest_file_path, html_doc)
+                elif write_text_file_if_changed(dest_file_path, html_doc):
+                    changed_files.append(str(dest_file_path))
+                if precompressor is not None:
+                    precompressor.submit(dest_file_path)
+            except Exception as error:
+                fail(content_file_path, error)
+
+    reader = threading.Thread(target=read_pages)
+    writer = threading.Thread(target=write_pages)
+    reader.start()
+    writer.start()
+    try:
+        while True:
+            item = read_queue.get()
+            if item is None:
+                break
+            content_file_path, dest_file_path, markdown_doc = item
+            try:
+                if markdown_doc is None:
+                    written, metadata = generate_page_streaming(
+                        content_file_path,
+                        template_path,
+                        dest_file_path,
+                        basepath,
+                        template,
+                        block_cache,
+                        changed_files is not None,
+                    )
+                    record_page(
+                        dest_file_path,
+                        written,
+                        metadata,
+                        changed_files,
+                        page_index,
+                        precompressor,
+                    )
+                    continue
+                html_doc, metadata = render_page(markdown_doc, template, block_cache)
+                # the writer thread records whether the page changed
+                record_page(
+                    dest_file_path,
+                    False,
+                    page_metadata(content_file_path, metadata),
+                    None,
+                    page_index,
+                )
+            except Exception as error:
+                fail(content_file_path, error)
+                continue
+            write_queue.put((content_file_path, dest_file_path, html_doc))
+    finally:
+        # unblock the reader if rendering stopped early, then drain the writer
+        stop.set()
+        while reader.is_alive():
+            try:
+                read_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        reader.join()
+        write_queue.put(None)
+        writer.join()
+
+    return failures
+
+
+# only re-render pages whose source, template or basepath (or, with
+# asset_urls, the fingerprint of any static file) changed since the build
+# recorded in the manifest, and delete outputs whose source is gone
+def generate_pages_incremental(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    basepath,
+    manifest_path,
+    jobs=1,
+    block_cache=None,
+    pipeline=False,
+    changed_files=None,
+    page_index=None,
+    asset_urls=None,
+    precompressor=None,
+):
+    print(
+        f"incrementally generating pages from {dir_path_content} into {dest_dir_path}..."
+    )
+
+    manifest = load_manifest(manifest_path)
+    previous_outputs = manifest["outputs"]
+    template_hash = hash_file(template_path)
+    assets_hash = hash_asset_urls(asset_urls) if asset_urls else None
+
+    outputs = {}
+    pages_to_render = []
+    for content_file_path, dest_file_path in find_pages(
+        dir_path_content, dest_dir_path
+    ):
+        entry = {
+            "source": str(content_file_path),
+            "source_hash": hash_file(content_file_path),
+            "template_hash": template_hash,
+            "basepath": basepath,
+        }
+        if assets_hash is not None:
+            entry["assets_hash"] = assets_hash
+        dest_key = str(dest_file_path)
+        if previous_outputs.get(dest_key) != entry or not os.path.exists(
+            dest_file_path
+        ):
+            pages_to_render.append((content_file_path, dest_file_path))
+        outputs[dest_key] = entry
+
+    render_pages(
+        pages_to_render,
+        template_path,
+        basepath,
+        jobs,
+        block_cache,
+        pipeline,
+        changed_files,
+        page_index,
+        asset_urls,
+        precompressor,
+    )
+
+    removed = remove_stale_outputs(
+        previous_outputs, outputs, dest_dir_path, changed_files
+    )
+
+    manifest["outputs"] = outputs
+    save_manifest(manifest, manifest_path)
+
+    print(
+        f"rendered {len(pages_to_render)} of {len(outputs)} pages, removed {removed} stale outputs"
+    )
+
+
+# delete the outputs of an earlier build, given by their paths in
+# previous_outputs, that are not in outputs, the paths of this build. the
+# paths deleted are appended to changed_files if it is given. returns how
+# many were deleted
+def remove_stale_outputs(previous_outputs, outputs, dest_dir_path, changed_files=None):
+    removed = 0
+    for dest_key in previous_outputs:
+        if dest_key not in outputs and os.path.exists(dest_key):
+            print(f"removing stale output {dest_key}")
+            remove_output(dest_key, dest_dir_path)
+            removed += 1
+            if changed_files is not None:
+                changed_files.append(dest_key)
+    return removed
@@ -1,4 +1,11 @@
+import io
+
+
+# nodes are created by the million on large sites, so they use __slots__
+# instead of a per-instance __dict__
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         tag: str | None = None,
@@ -27,6 +34,8 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
@@ -44,21 +53,43 @@ class LeafNode(HTMLNode):
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
     def to_html(self):
+        out = io.StringIO()
+        write_html(self, out)
+        return out.getvalue()
+
+    def check(self):
         if not self.tag:
             raise ValueError("all parent nodes must have a tag")
 
         if not self.children:
             raise ValueError("all parent nodes must have children")
 
-        children = ""
-        for i in range(len(self.children)):
-            children += self.children[i].to_html()
-
-        return f"<{self.tag}{self.props_to_html()}>{children}</{self.tag}>"
-
     def __repr__(self):
         return f"ParentNode({self.tag}, children: {self.children}, {self.props})"
+
+
+# serialize a node tree into out (anything with a write method, e.g. an open
+# file or io.StringIO) in a single pre-order walk. an explicit stack replaces
+# recursion, so no intermediate string is built per subtree and deeply nested
+# documents cannot hit the recursion limit
+def write_html(node, out):
+    write = out.write
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            # closing tag pushed when its parent was opened
+            write(item)
+        elif isinstance(item, ParentNode):
+            item.check()
+            write(f"<{item.tag}{item.props_to_html()}>")
+            stack.append(f"</{item.tag}>")
+            stack.extend(reversed(item.children))
+        else:
+            write(item.to_html())
@@ -2,16 +2,94 @@ import re
 
 from textnode import TextNode, TextType
 
-
+IMAGE_PATTERN = re.compile(r"\!\[(.*?)\]\((.*?)\)")
+# the lookbehind sits after the literal "[" so the regex engine can skip ahead
+# to candidate brackets instead of testing the lookbehind at every position
+LINK_PATTERN = re.compile(r"\[(?<!!\[)(.*?)\]\((.*?)\)")
+DELIMITER_PATTERN = re.compile(r"(\*\*|_|`)")
+
+DELIMITER_TEXT_TYPES = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+
+# delimiters are matched in priority order (bold, then italic, then code), so a
+# span may not contain a delimiter that outranks its own
+OUTRANKING_DELIMITERS = {
+    "**": (),
+    "_": ("**",),
+    "`": ("**", "_"),
+}
+
+
+# tokenize inline markdown in a single left-to-right scan. this produces the
+# same nodes as running split_nodes_delimiter for "**", "_" and "`" followed by
+# split_nodes_image and split_nodes_link, without building a list per pass
 def text_to_textnodes(text):
-    node = TextNode(text, TextType.TEXT)
-    step1 = split_nodes_delimiter([node], "**", TextType.BOLD)
-    step2 = split_nodes_delimiter(step1, "_", TextType.ITALIC)
-    step3 = split_nodes_delimiter(step2, "`", TextType.CODE)
-    step4 = split_nodes_image(step3)
-    result = split_nodes_link(step4)
+    new_nodes = []
+
+    # alternates text, delimiter, text, delimiter, ..., text
+    parts = DELIMITER_PATTERN.split(text)
+    append_text_run(new_nodes, parts[0])
+
+    i = 1
+    while i < len(parts):
+        delimiter = parts[i]
+        outranking = OUTRANKING_DELIMITERS[delimiter]
+
+        # delimiters that rank below this one are literal text inside the span
+        span_parts = [parts[i + 1]]
+        i += 2
+        while i < len(parts) and parts[i] != delimiter:
+            if parts[i] in outranking:
+                raise Exception("closing delimeter missing")
+            span_parts.append(parts[i])
+            span_parts.append(parts[i + 1])
+            i += 2
+        if i >= len(parts):
+            raise Exception("closing delimeter missing")
+
+        span = "".join(span_parts)
+        if span != "":
+            new_nodes.append(TextNode(span, DELIMITER_TEXT_TYPES[delimiter]))
+
+        append_text_run(new_nodes, parts[i + 1])
+        i += 2
+
+    return new_nodes
+
+
+# append the plain text between two delimiter spans, splitting out images
+# first and then links, as split_nodes_image and split_nodes_link would
+def append_text_run(new_nodes, text):
+    # both images and links need a "[", most runs of prose have none
+    if "[" not in text:
+        if text != "":
+            new_nodes.append(TextNode(text, TextType.TEXT))
+        return
+
+    # alternates text, alt, url, text, alt, url, ..., text
+    parts = IMAGE_PATTERN.split(text)
+    for i in range(0, len(parts), 3):
+        append_links(new_nodes, parts[i])
+        if i + 1 < len(parts):
+            new_nodes.append(TextNode(parts[i + 1], TextType.IMAGE, parts[i + 2]))
+
+
+def append_links(new_nodes, text):
+    if "[" not in text:
+        if text != "":
+            new_nodes.append(TextNode(text, TextType.TEXT))
+        return
 
-    return result
+    # alternates text, anchor, url, text, anchor, url, ..., text
+    parts = LINK_PATTERN.split(text)
+    for i in range(0, len(parts), 3):
+        if parts[i] != "":
+            new_nodes.append(TextNode(parts[i], TextType.TEXT))
+        if i + 1 < len(parts):
+            new_nodes.append(TextNode(parts[i + 1], TextType.LINK, parts[i + 2]))
 
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
@@ -103,10 +181,14 @@ def split_nodes_link(old_nodes):
 
 
 def extract_markdown_images(text):
-    matches = re.findall(r"\!\[(.*?)\]\((.*?)\)", text)
+    if "![" not in text:
+        return []
+    matches = IMAGE_PATTERN.findall(text)
     return matches
 
 
 def extract_markdown_links(text):
-    matches = re.findall(r"(?<!!)\[(.*?)\]\((.*?)\)", text)
+    if "[" not in text:
+        return []
+    matches = LINK_PATTERN.findall(text)
     return matches
@@ -1,16 +1,411 @@
-from copy_files import copy_files
-from generate_page import generate_pages_recursive
+import argparse
+import contextlib
+import os
+import shutil
 import sys
 
-def main():
-    basepath = "/"
-    if len(sys.argv) > 0:
-        basepath = sys.argv[0]
+from block_cache import BlockCache, load_block_cache, save_block_cache
+from copy_files import LINK_MODES, copy_files_parallel, sync_files
+from feeds import write_feeds
+from fingerprint import fingerprint_assets
+from generate_page import (
+    find_pages,
+    generate_pages_incremental,
+    generate_pages_parallel,
+    generate_pages_pipelined,
+    generate_pages_recursive,
+    remove_stale_outputs,
+)
+from page_index import load_page_index, save_page_index
+from precompress import PRECOMPRESS_MANIFEST_NAME, PRECOMPRESS_THRESHOLD, Precompressor
+from profiler import BuildProfiler, format_report, write_report
+from render_server import RenderServer, RenderSocketServer, serve_lines
+from template import load_template
+from watch import Watcher
+
+MANIFEST_PATH = ".build/manifest.json"
+BLOCK_CACHE_PATH = ".build/block-cache.json"
+CHANGED_FILES_PATH = ".build/changed-files.txt"
+PAGE_INDEX_PATH = ".build/pages.json"
+ASSET_MANIFEST_PATH = ".build/assets.json"
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site into docs/")
+    parser.add_argument(
+        "basepath", nargs="?", default="/", help="URL prefix the site is served from"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"only re-render pages whose inputs changed since the last build (tracked in {MANIFEST_PATH})",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="render pages on N worker processes (default: 1)",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="read and write pages on background threads while rendering others",
+    )
+    parser.add_argument(
+        "--write-if-changed",
+        action="store_true",
+        help=f"leave pages whose html did not change untouched and list the changed ones in {CHANGED_FILES_PATH}",
+    )
+    parser.add_argument(
+        "--link-assets",
+        choices=LINK_MODES,
+        default="copy",
+        help="how --incremental and --fingerprint-assets put changed static files into docs (default: copy)",
+    )
+    parser.add_argument(
+        "--hash-assets",
+        action="store_true",
+        help="with --incremental, compare static files by content when their mtime differs",
+    )
+    parser.add_argument(
+        "--fingerprint-assets",
+        action="store_true",
+        help=f"publish static files under names carrying their content hash and point the pages at them (hashes kept in {ASSET_MANIFEST_PATH})",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help=f"write a gzip sibling of every text output above --precompress-threshold while the pages render, listed in docs/{PRECOMPRESS_MANIFEST_NAME}",
+    )
+    parser.add_argument(
+        "--precompress-threshold",
+        type=int,
+        default=PRECOMPRESS_THRESHOLD,
+        metavar="BYTES",
+        help=f"smallest output that gets a gzip sibling (default: {PRECOMPRESS_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--copy-workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="copy static files on N threads (default: Python's thread pool default)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="after building, keep rebuilding pages and static files as they change",
+    )
+    parser.add_argument(
+        "--block-cache",
+        action="store_true",
+        help=f"reuse html of unchanged markdown blocks across builds (kept in {BLOCK_CACHE_PATH})",
+    )
+    parser.add_argument(
+        "--site-url",
+        default="",
+        metavar="URL",
+        help="origin the site is published at, e.g. https://example.com. sitemap.xml and the section feeds are only written when it is given",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        metavar="PATH",
+        help="time each build stage and print a report, or write it as JSON to PATH",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="number of slowest pages listed in the profile (default: 10)",
+    )
+    args = parser.parse_args(argv)
+    if args.fingerprint_assets and args.watch:
+        # the watcher copies changed static files under their own names
+        parser.error("--fingerprint-assets cannot be combined with --watch")
+    if args.site_url and args.watch:
+        # the watcher does not update the page index the feeds are built from
+        parser.error("--site-url cannot be combined with --watch")
+    if args.precompress and args.watch:
+        # the watcher would leave stale gzip siblings behind
+        parser.error("--precompress cannot be combined with --watch")
+    return args
+
+
+def parse_serve_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py serve-render",
+        description="Render markdown on request, one json object per line",
+    )
+    parser.add_argument(
+        "basepath", nargs="?", default="/", help="URL prefix the site is served from"
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="listen on a unix socket at PATH instead of reading stdin",
+    )
+    parser.add_argument(
+        "--template",
+        default="template.html",
+        help="template for requests that ask for a full page (default: template.html)",
+    )
+    parser.add_argument(
+        "--block-cache",
+        action="store_true",
+        help=f"start from and save the block cache in {BLOCK_CACHE_PATH}",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["serve-render"]:
+        serve_render(parse_serve_args(argv[1:]))
+        return
+
+    args = parse_args(argv)
+
+    profiler = None
+    if args.profile:
+        profiler = BuildProfiler()
+        profiler.install()
+
+    block_cache = load_block_cache(BLOCK_CACHE_PATH) if args.block_cache else None
+    changed_files = [] if args.write_if_changed else None
+    # an incremental build only renders some pages, the rest keep their entries
+    page_index = load_page_index(PAGE_INDEX_PATH) if args.incremental else {}
+    precompressor = None
+
+    try:
+        print(f"\n\n====COPYING STATIC FILES====")
+        with profiler.stage("copy_files") if profiler else contextlib.nullcontext():
+            asset_urls = copy_static(args, changed_files)
+
+        # created once docs exists, and fed pages while they are rendered
+        if args.precompress:
+            precompressor = Precompressor("docs", args.precompress_threshold)
+
+        print(f"\n\n====GENERATING PAGES====")
+        generate_pages(
+            args, block_cache, changed_files, page_index, asset_urls, precompressor
+        )
+    finally:
+        if profiler is not None:
+            profiler.uninstall()
+
+    if profiler is not None:
+        print_profile(profiler, args)
+
+    # drop the pages whose outputs were removed
+    page_index = {
+        dest_path: metadata
+        for dest_path, metadata in page_index.items()
+        if os.path.exists(dest_path)
+    }
+    save_page_index(page_index, PAGE_INDEX_PATH)
+
+    print(f"\n\n====WRITING SITEMAP AND FEEDS====")
+    if args.site_url:
+        write_feeds(
+            page_index,
+            "docs",
+            args.basepath,
+            load_template("template.html", args.basepath, asset_urls),
+            args.site_url,
+            changed_files,
+        )
+    else:
+        print(
+            "skipping sitemap.xml and feeds, they need absolute urls: pass --site-url"
+        )
+
+    if precompressor is not None:
+        print(f"\n\n====PRECOMPRESSING OUTPUTS====")
+        precompressor.finish(changed_files)
+
+    if changed_files is not None:
+        save_changed_files(changed_files, CHANGED_FILES_PATH)
+        print(f"{len(changed_files)} files changed, listed in {CHANGED_FILES_PATH}")
+
+    if args.watch:
+        Watcher(
+            "content", "template.html", "static", "docs", args.basepath, block_cache
+        ).run()
+
+    if block_cache is not None:
+        save_block_cache(block_cache, BLOCK_CACHE_PATH)
+        print(
+            f"block cache: {block_cache.hits} hits, {block_cache.misses} misses, {len(block_cache)} blocks"
+        )
+
+
+# a full copy starts by deleting docs, which would defeat --write-if-changed
+# and throw away the gzip siblings --precompress reuses, so those keep docs
+# and sync static files the way --incremental does
+def keeps_docs(args):
+    return args.incremental or args.write_if_changed or args.precompress
+
+
+# the synced files are appended to changed_files if it is given. returns the
+# urls of the fingerprinted static files, or None when they keep their names
+def copy_static(args, changed_files=None):
+    if args.fingerprint_assets:
+        if not keeps_docs(args) and os.path.exists("docs"):
+            shutil.rmtree("docs")
+        return fingerprint_assets(
+            "static",
+            "docs",
+            ASSET_MANIFEST_PATH,
+            args.link_assets,
+            args.copy_workers,
+            changed_files,
+        )
+
+    if keeps_docs(args):
+        synced = sync_files(
+            "static",
+            "docs",
+            MANIFEST_PATH,
+            args.link_assets,
+            args.hash_assets,
+            args.copy_workers,
+        )
+        if changed_files is not None:
+            changed_files.extend(synced)
+    else:
+        copy_files_parallel("static", "docs", args.copy_workers)
+
+
+def generate_pages(
+    args, block_cache, changed_files, page_index, asset_urls=None, precompressor=None
+):
+    if args.incremental:
+        generate_pages_incremental(
+            "content",
+            "template.html",
+            "docs",
+            args.basepath,
+            MANIFEST_PATH,
+            args.jobs,
+            block_cache,
+            args.pipeline,
+            changed_files,
+            page_index,
+            asset_urls,
+            precompressor,
+        )
+    elif args.jobs > 1:
+        generate_pages_parallel(
+            "content",
+            "template.html",
+            "docs",
+            args.basepath,
+            args.jobs,
+            changed_files,
+            page_index,
+            asset_urls,
+            precompressor,
+        )
+    elif args.pipeline:
+        generate_pages_pipelined(
+            "content",
+            "template.html",
+            "docs",
+            args.basepath,
+            block_cache,
+            changed_files,
+            page_index,
+            asset_urls,
+            precompressor,
+        )
+    else:
+        generate_pages_recursive(
+            "content",
+            "template.html",
+            "docs",
+            args.basepath,
+            block_cache=block_cache,
+            changed_files=changed_files,
+            page_index=page_index,
+            asset_urls=asset_urls,
+            precompressor=precompressor,
+        )
+
+    # docs was not emptied, so the pages of the previous build, as listed in
+    # its page index, whose markdown is gone are still there
+    if keeps_docs(args) and not args.incremental:
+        remove_stale_outputs(
+            load_page_index(PAGE_INDEX_PATH),
+            {
+                str(dest_file_path)
+                for _, dest_file_path in find_pages("content", "docs")
+            },
+            "docs",
+            changed_files,
+        )
+
+
+# one path per line, for the deploy step to push only the pages that changed
+def save_changed_files(changed_files, changed_files_path):
+    os.makedirs(os.path.dirname(changed_files_path), exist_ok=True)
+    with open(changed_files_path, "w") as changed_files_file:
+        for path in sorted(changed_files):
+            changed_files_file.write(f"{path}\n")
+
+
+def print_profile(profiler, args):
+    if args.jobs > 1:
+        print(
+            "note: pages rendered by worker processes are not included in the profile"
+        )
+    elif args.pipeline:
+        # reads and writes overlap the render on other threads, so the stages
+        # cannot be charged to one page at a time
+        print(
+            "note: the pipelined build is only timed per stage, pages are not timed one by one"
+        )
+
+    report = profiler.report(args.profile_top)
+    if args.profile == "-":
+        print(f"\n\n====BUILD PROFILE====")
+        print(format_report(report))
+    else:
+        write_report(report, args.profile)
+        print(f"build profile written to {args.profile}")
+
+
+# keep the renderer loaded and answer render requests, so previews do not pay
+# for interpreter startup and imports. stdout carries the responses, so status
+# messages go to stderr
+def serve_render(args):
+    template = load_template(args.template, args.basepath)
+    if args.block_cache:
+        block_cache = load_block_cache(BLOCK_CACHE_PATH)
+    else:
+        block_cache = BlockCache()
+    render_server = RenderServer(template, block_cache)
+
+    try:
+        if args.socket:
+            with RenderSocketServer(args.socket, render_server) as socket_server:
+                print(f"serving renders on {args.socket}", file=sys.stderr)
+                socket_server.serve_forever()
+        else:
+            serve_lines(render_server, sys.stdin, sys.stdout)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(
+            f"rendered {render_server.requests} requests, block cache: {block_cache.hits} hits, {block_cache.misses} misses",
+            file=sys.stderr,
+        )
+        if args.block_cache:
+            save_block_cache(block_cache, BLOCK_CACHE_PATH)
 
-    print(f"\n\n====COPYING STATIC FILES====")
-    copy_files("static", "docs")
-    print(f"\n\n====GENERATING PAGES====")
-    generate_pages_recursive("content", "template.html", "docs", basepath)
 
 if __name__ == "__main__":
     main()
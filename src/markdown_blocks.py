@@ -1,15 +1,61 @@
 from enum import Enum
+import io
 import re
 
+from block_cache import block_cache_key
 from inline_markdown import text_to_textnodes
-from textnode import TextNode, TextType, text_node_to_html_node
+from textnode import (
+    TextNode,
+    TextType,
+    text_node_to_html,
+    text_node_to_html_node,
+    write_text_nodes_html,
+)
 from htmlnode import ParentNode
 
 
 def markdown_to_blocks(markdown):
-    blocks = markdown.split("\n\n")
-    stripped_blocks = list(map(lambda x: x.strip(), filter(lambda x: x != "", blocks)))
-    return stripped_blocks
+    return ["\n".join(lines) for lines in iter_block_lines(markdown.split("\n"))]
+
+
+# group an iterable of lines (without their trailing "\n") into blocks, one
+# list of lines per block. a blank line ends a block, and each block has its
+# leading and trailing whitespace stripped
+def iter_block_lines(lines):
+    block_lines = []
+    for line in lines:
+        if line != "":
+            block_lines.append(line)
+            continue
+        if block_lines:
+            stripped_lines = strip_block_lines(block_lines)
+            if stripped_lines:
+                yield stripped_lines
+            block_lines = []
+
+    if block_lines:
+        stripped_lines = strip_block_lines(block_lines)
+        if stripped_lines:
+            yield stripped_lines
+
+
+# the line-wise equivalent of "\n".join(lines).strip(): drop whitespace-only
+# lines at either end, then strip the first and last remaining lines
+def strip_block_lines(lines):
+    first = 0
+    while first < len(lines) and lines[first].strip() == "":
+        first += 1
+    if first == len(lines):
+        return []
+
+    last = len(lines) - 1
+    while lines[last].strip() == "":
+        last -= 1
+
+    stripped_lines = lines[first : last + 1]
+    stripped_lines[0] = stripped_lines[0].lstrip()
+    stripped_lines[-1] = stripped_lines[-1].rstrip()
+    return stripped_lines
 
 
 class BlockType(Enum):
@@ -21,25 +67,51 @@ class BlockType(Enum):
     ORDERED_LIST = "ordered_list"
 
 
+# compiled once here rather than passed to re.* as strings on every call,
+# which would depend on the re module's small internal pattern cache
+HEADING_PATTERN = re.compile(r"#{1,6} ")
+HEADING_MARKER_PATTERN = re.compile(r"#{1,6}")
+NUMBER_PATTERN = re.compile(r"\d+\. ")
+
+
 def block_to_block_type(block):
-    lines = block.split("\n")
-    if re.match(r"^#{1,6} ", block):
-        return BlockType.HEADING
-    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
-        return BlockType.CODE
-    if all(re.match(r"^>", line) for line in block.split("\n")):
-        return BlockType.QUOTE
-    if all(re.match(r"^- ", line) for line in block.split("\n")):
-        return BlockType.UNORDERED_LIST
-    if is_ordered_list(block):
-        return BlockType.ORDERED_LIST
+    return block_lines_to_block_type(block.split("\n"))
+
+
+# the first character of the block rules out all but one block type, so only
+# that type's check has to look at the remaining lines
+def block_lines_to_block_type(lines):
+    first_line = lines[0]
+    marker = first_line[:1]
+
+    if marker == "#":
+        if HEADING_PATTERN.match(first_line):
+            return BlockType.HEADING
+    elif marker == "`":
+        if (
+            len(lines) > 1
+            and first_line.startswith("```")
+            and lines[-1].startswith("```")
+        ):
+            return BlockType.CODE
+    elif marker == ">":
+        if all(line.startswith(">") for line in lines):
+            return BlockType.QUOTE
+    elif marker == "-":
+        if all(line.startswith("- ") for line in lines):
+            return BlockType.UNORDERED_LIST
+    elif marker == "1":
+        if is_ordered_list_lines(lines):
+            return BlockType.ORDERED_LIST
+
     return BlockType.PARAGRAPH
 
 
 def is_ordered_list(block):
-    if not block.startswith("1. "):
-        return False
-    lines = block.split("\n")
+    return is_ordered_list_lines(block.split("\n"))
+
+
+def is_ordered_list_lines(lines):
     i = 1
     for line in lines:
         if not line.startswith(f"{i}. "):
@@ -49,69 +121,14 @@ def is_ordered_list(block):
 
 
 def markdown_to_html_node(markdown):
-    # split markdown into an array of lines
-    blocks = markdown_to_blocks(markdown)
-
     html_nodes = []
-    for block in blocks:
+    for lines in iter_block_lines(markdown.split("\n")):
         # determine the type of block, returns a BlockType
-        block_type = block_to_block_type(block)
+        block_type = block_lines_to_block_type(lines)
 
         # based on the type of block, create a new HTML node with the proper data
         # and assign the proper child HTMLNode objects to the block node
-        if block_type.value == "paragraph":
-            paragraph_lines = block.split("\n")
-            paragraph_text = " ".join(paragraph_lines)
-            children = text_to_children(paragraph_text)
-            paragraph_html_node = ParentNode("p", children)
-            html_nodes.append(paragraph_html_node)
-
-        if block_type.value == "heading":
-            heading_level, heading_text = extract_heading(block)
-            children = text_to_children(heading_text)
-            heading_html_node = ParentNode(f"h{heading_level}", children)
-            html_nodes.append(heading_html_node)
-
-        # the code block is special - it should not do any inline markdown parsing of its children
-        if block_type.value == "code":
-            code_text = extract_code(block)
-            code_text_node = TextNode(code_text, TextType.CODE)
-            child = text_node_to_html_node(code_text_node)
-            code_html_node = ParentNode("pre", [child])
-            html_nodes.append(code_html_node)
-
-        if block_type.value == "quote":
-            quote_lines = block.split("\n")
-            quote_text_lines = []
-            for line in quote_lines:
-                quote_line_text = extract_quote(line)
-                quote_text_lines.append(quote_line_text)
-            quote_text = " ".join(quote_text_lines)
-            children = text_to_children(quote_text)
-            quote_html_node = ParentNode("blockquote", children)
-            html_nodes.append(quote_html_node)
-
-        if block_type.value == "unordered_list":
-            list_lines = block.split("\n")
-            children = []
-            for line in list_lines:
-                line_text = extract_bullet(line)
-                line_item_children = text_to_children(line_text)
-                line_item_node = ParentNode("li", line_item_children)
-                children.append(line_item_node)
-            unordered_list_node = ParentNode("ul", children)
-            html_nodes.append(unordered_list_node)
-
-        if block_type.value == "ordered_list":
-            list_lines = block.split("\n")
-            children = []
-            for line in list_lines:
-                line_text = extract_number(line)
-                line_item_children = text_to_children(line_text)
-                line_item_node = ParentNode("li", line_item_children)
-                children.append(line_item_node)
-            ordered_list_node = ParentNode("ol", children)
-            html_nodes.append(ordered_list_node)
+        html_nodes.append(BLOCK_TO_HTML_NODE[block_type](lines))
 
     # make all block nodes under a single parent HTMLNode with tag "div"
     parent_node = ParentNode("div", html_nodes)
@@ -119,6 +136,176 @@ def markdown_to_html_node(markdown):
     return parent_node
 
 
+# markdown_to_html_node(markdown).to_html(), written straight from the inline
+# runs without building the node tree. with a BlockCache blocks whose markdown
+# has been rendered before are spliced in from the cache. given a metadata
+# dict, the page title is recorded in it along the way (see
+# write_markdown_html)
+def markdown_to_html(markdown, block_cache=None, metadata=None):
+    out = io.StringIO()
+    write_markdown_html(markdown.split("\n"), out, block_cache, metadata)
+    return out.getvalue()
+
+
+# the title of a page is its first block that is an h1 heading
+def block_title(block_lines):
+    if block_lines[0].startswith("# "):
+        return block_lines[0][2:]
+    return None
+
+
+# the streaming counterpart of markdown_to_html_node(...).to_html(): render one
+# block at a time from an iterable of lines (e.g. an open file) and write it to
+# out as soon as it is done, so memory use is bounded by the largest block.
+# unless metadata already has a "title", the text of the first block that
+# starts with "# " is stored there, so finding the title needs no extra pass
+def write_markdown_html(lines, out, block_cache=None, metadata=None):
+    out.write("<div>")
+    block_count = 0
+    find_title = metadata is not None and metadata.get("title") is None
+    for block_lines in iter_block_lines(lines):
+        if find_title:
+            title = block_title(block_lines)
+            if title is not None:
+                metadata["title"] = title
+                find_title = False
+        if block_cache is None:
+            write_block_html(block_lines, out)
+        else:
+            out.write(render_cached_block(block_lines, block_cache))
+        block_count += 1
+
+    if block_count == 0:
+        raise ValueError("all parent nodes must have children")
+    out.write("</div>")
+
+
+def block_lines_to_html_node(lines):
+    block_type = block_lines_to_block_type(lines)
+    return BLOCK_TO_HTML_NODE[block_type](lines)
+
+
+def render_cached_block(lines, block_cache):
+    key = block_cache_key(lines)
+    html = block_cache.get(key)
+    if html is None:
+        out = io.StringIO()
+        write_block_html(lines, out)
+        html = out.getvalue()
+        block_cache.put(key, html)
+    return html
+
+
+def paragraph_to_html_node(lines):
+    paragraph_text = " ".join(lines)
+    children = text_to_children(paragraph_text)
+    return ParentNode("p", children)
+
+
+def heading_to_html_node(lines):
+    heading_level, heading_text = extract_heading("\n".join(lines))
+    children = text_to_children(heading_text)
+    return ParentNode(f"h{heading_level}", children)
+
+
+# the code block is special - it should not do any inline markdown parsing of its children
+def code_to_html_node(lines):
+    code_text = extract_code_lines(lines)
+    code_text_node = TextNode(code_text, TextType.CODE)
+    child = text_node_to_html_node(code_text_node)
+    return ParentNode("pre", [child])
+
+
+def quote_to_html_node(lines):
+    quote_text_lines = []
+    for line in lines:
+        quote_line_text = extract_quote(line)
+        quote_text_lines.append(quote_line_text)
+    quote_text = " ".join(quote_text_lines)
+    children = text_to_children(quote_text)
+    return ParentNode("blockquote", children)
+
+
+def unordered_list_to_html_node(lines):
+    children = []
+    for line in lines:
+        line_text = extract_bullet(line)
+        line_item_children = text_to_children(line_text)
+        children.append(ParentNode("li", line_item_children))
+    return ParentNode("ul", children)
+
+
+def ordered_list_to_html_node(lines):
+    children = []
+    for line in lines:
+        line_text = extract_number(line)
+        line_item_children = text_to_children(line_text)
+        children.append(ParentNode("li", line_item_children))
+    return ParentNode("ol", children)
+
+
+BLOCK_TO_HTML_NODE = {
+    BlockType.PARAGRAPH: paragraph_to_html_node,
+    BlockType.HEADING: heading_to_html_node,
+    BlockType.CODE: code_to_html_node,
+    BlockType.QUOTE: quote_to_html_node,
+    BlockType.UNORDERED_LIST: unordered_list_to_html_node,
+    BlockType.ORDERED_LIST: ordered_list_to_html_node,
+}
+
+
+# the writers below are the fast path: they produce the same html as the
+# *_to_html_node functions above, but write each inline run into out as soon
+# as it is parsed, so no LeafNode or ParentNode is allocated. the node
+# functions remain for callers that want the tree itself
+def write_block_html(lines, out):
+    block_type = block_lines_to_block_type(lines)
+    BLOCK_TO_HTML[block_type](lines, out)
+
+
+def write_paragraph_html(lines, out):
+    write_inline_html("p", " ".join(lines), out)
+
+
+def write_heading_html(lines, out):
+    heading_level, heading_text = extract_heading("\n".join(lines))
+    write_inline_html(f"h{heading_level}", heading_text, out)
+
+
+def write_code_html(lines, out):
+    code_text_node = TextNode(extract_code_lines(lines), TextType.CODE)
+    out.write(f"<pre>{text_node_to_html(code_text_node)}</pre>")
+
+
+def write_quote_html(lines, out):
+    quote_text = " ".join(extract_quote(line) for line in lines)
+    write_inline_html("blockquote", quote_text, out)
+
+
+def write_unordered_list_html(lines, out):
+    out.write("<ul>")
+    for line in lines:
+        write_inline_html("li", extract_bullet(line), out)
+    out.write("</ul>")
+
+
+def write_ordered_list_html(lines, out):
+    out.write("<ol>")
+    for line in lines:
+        write_inline_html("li", extract_number(line), out)
+    out.write("</ol>")
+
+
+BLOCK_TO_HTML = {
+    BlockType.PARAGRAPH: write_paragraph_html,
+    BlockType.HEADING: write_heading_html,
+    BlockType.CODE: write_code_html,
+    BlockType.QUOTE: write_quote_html,
+    BlockType.UNORDERED_LIST: write_unordered_list_html,
+    BlockType.ORDERED_LIST: write_ordered_list_html,
+}
+
+
 # --- Helper functions ---
 
 
@@ -133,8 +320,20 @@ def text_to_children(text):
     return html_nodes
 
 
+# write text's inline markdown wrapped in tag, as ParentNode(tag,
+# text_to_children(text)).to_html() would
+def write_inline_html(tag, text, out):
+    text_nodes = text_to_textnodes(text)
+    if not text_nodes:
+        raise ValueError("all parent nodes must have children")
+
+    out.write(f"<{tag}>")
+    write_text_nodes_html(text_nodes, out)
+    out.write(f"</{tag}>")
+
+
 def extract_heading(text):
-    matches = re.search(r"^#{1,6}", text)
+    matches = HEADING_MARKER_PATTERN.match(text)
     heading_regex = matches.group(0)
     heading_level = len(heading_regex)
     heading_text = text.strip(f"{heading_regex} ")
@@ -142,26 +341,36 @@ def extract_heading(text):
     return heading_level, heading_text
 
 
+# the markers below are fixed strings, so a startswith check does the work of
+# the regex. only the number marker still needs one, once the first character
+# shows it can match
 def extract_bullet(text):
-    bullet_text = re.sub(r"^- ", "", text)
-
-    return bullet_text
+    if text.startswith("- "):
+        return text[2:]
+    return text
 
 
 def extract_number(text):
-    number_text = re.sub(r"^\d+\. ", "", text)
+    if not text[:1].isdigit():
+        return text
 
-    return number_text
+    matches = NUMBER_PATTERN.match(text)
+    if matches is None:
+        return text
+    return text[matches.end() :]
 
 
 def extract_quote(text):
-    quote_text = re.sub(r"^>", "", text)
-
-    return quote_text.strip()
+    if text.startswith(">"):
+        text = text[1:]
+    return text.strip()
 
 
 def extract_code(text):
-    lines = text.split("\n")
+    return extract_code_lines(text.split("\n"))
+
+
+def extract_code_lines(lines):
     code_lines = lines[1:-1]
     code_block = "\n".join(code_lines)
 
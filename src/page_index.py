@@ -0,0 +1,17 @@
+from build_manifest import load_versioned_json, save_versioned_json
+
+PAGE_INDEX_VERSION = 1
+
+
+# the metadata of every page of the last build, keyed by output path. it is
+# collected while the pages render, so later stages (and later builds, for
+# pages an incremental build skipped) never have to reopen the markdown
+def load_page_index(index_path):
+    data = load_versioned_json(index_path, PAGE_INDEX_VERSION)
+    if data is None:
+        return {}
+    return data.get("pages", {})
+
+
+def save_page_index(page_index, index_path):
+    save_versioned_json({"pages": page_index}, index_path, PAGE_INDEX_VERSION, indent=2)
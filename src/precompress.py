@@ -0,0 +1,163 @@
+import concurrent.futures
+import os
+import threading
+import zlib
+
+from build_manifest import hash_file, load_versioned_json, save_versioned_json
+
+PRECOMPRESS_MANIFEST_NAME = "precompressed.json"
+PRECOMPRESS_MANIFEST_VERSION = 1
+
+# smaller responses fit in a packet or two, where compressing them gains little
+PRECOMPRESS_THRESHOLD = 1024
+
+PRECOMPRESS_EXTENSIONS = (".html", ".css", ".js", ".xml", ".svg", ".json", ".txt")
+
+# wbits for zlib.compressobj that produce a gzip stream instead of a zlib one
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+CHUNK_SIZE = 1024 * 1024
+
+
+# writes a maximum level gzip sibling (index.html.gz) next to every text
+# output of the build above threshold bytes, on a pool of threads so it runs
+# while the build is still rendering; zlib releases the GIL while it
+# compresses. pages are submitted as they are written and finish picks up
+# every other output. the manifest in dest_dir maps the url of every file
+# that has a sibling to it, so a server can pick the precompressed file
+# without probing the disk, and records the content hash each sibling was
+# made from, so the next build skips the files that did not change
+class Precompressor:
+    def __init__(self, dest_dir_path, threshold=PRECOMPRESS_THRESHOLD, workers=None):
+        self.dest_dir_path = dest_dir_path
+        self.threshold = threshold
+        self.manifest_path = os.path.join(dest_dir_path, PRECOMPRESS_MANIFEST_NAME)
+        self.previous_files = load_precompress_manifest(self.manifest_path)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    # called from the render and writer threads once path has been written
+    def submit(self, path):
+        # the same file must not be compressed by two threads at once
+        path = os.path.normpath(path)
+        if not path.endswith(PRECOMPRESS_EXTENSIONS):
+            return
+        with self.lock:
+            if path in self.futures:
+                return
+            self.futures[path] = self.executor.submit(self.precompress, path)
+
+    # compress whatever the build did not submit, wait for all of it and write
+    # the manifest. the sibling of every output that is gone is deleted. the
+    # siblings written or deleted and the manifest, if it changed, are
+    # appended to changed_files if it is given. returns the manifest entries
+    def finish(self, changed_files=None):
+        for directory, _, names in os.walk(self.dest_dir_path):
+            for name in sorted(names):
+                if name != PRECOMPRESS_MANIFEST_NAME:
+                    self.submit(os.path.join(directory, name))
+
+        files = {}
+        compressed = 0
+        try:
+            for path, future in self.futures.items():
+                entry, written, removed = future.result()
+                if entry is not None:
+                    files[self.url(path)] = entry
+                if written:
+                    compressed += 1
+                if (written or removed) and changed_files is not None:
+                    changed_files.append(f"{path}.gz")
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+
+        for url in self.previous_files:
+            path = self.path(url)
+            if path not in self.futures and remove_file(f"{path}.gz"):
+                if changed_files is not None:
+                    changed_files.append(f"{path}.gz")
+
+        manifest_written = save_versioned_json(
+            {"files": files},
+            self.manifest_path,
+            PRECOMPRESS_MANIFEST_VERSION,
+            indent=2,
+            only_if_changed=True,
+        )
+        if manifest_written and changed_files is not None:
+            changed_files.append(self.manifest_path)
+
+        print(
+            f"precompressed {compressed} files, {len(files) - compressed} unchanged, listed in {self.manifest_path}"
+        )
+        return files
+
+    # returns the manifest entry of path, None if it gets no sibling, whether
+    # the sibling was written and whether a sibling of an earlier build was
+    # deleted
+    def precompress(self, path):
+        gzip_path = f"{path}.gz"
+        size = os.path.getsize(path)
+        if size < self.threshold:
+            return None, False, remove_file(gzip_path)
+
+        content_hash = hash_file(path)
+        previous_entry = self.previous_files.get(self.url(path))
+        if (
+            previous_entry is not None
+            and previous_entry["sha256"] == content_hash
+            and os.path.exists(gzip_path)
+        ):
+            return previous_entry, False, False
+
+        existed = os.path.exists(gzip_path)
+        gzip_size = gzip_file(path, gzip_path)
+        if gzip_size >= size:
+            # not worth sending compressed
+            remove_file(gzip_path)
+            return None, False, existed
+
+        entry = {
+            "gzip": self.url(gzip_path),
+            "size": size,
+            "gzip_size": gzip_size,
+            "sha256": content_hash,
+        }
+        return entry, True, False
+
+    def url(self, path):
+        return "/" + os.path.relpath(path, self.dest_dir_path).replace(os.sep, "/")
+
+    def path(self, url):
+        return os.path.join(self.dest_dir_path, *url[1:].split("/"))
+
+
+def load_precompress_manifest(manifest_path):
+    data = load_versioned_json(manifest_path, PRECOMPRESS_MANIFEST_VERSION)
+    if data is None:
+        return {}
+    return data.get("files", {})
+
+
+# compress source_path at the highest level into gzip_path a chunk at a time,
+# through a temp file moved into place. returns the compressed size
+def gzip_file(source_path, gzip_path):
+    temp_path = f"{gzip_path}.tmp"
+    compressor = zlib.compressobj(9, zlib.DEFLATED, GZIP_WBITS, 9)
+    with open(source_path, "rb") as source_file, open(temp_path, "wb") as output_file:
+        for chunk in iter(lambda: source_file.read(CHUNK_SIZE), b""):
+            output_file.write(compressor.compress(chunk))
+        output_file.write(compressor.flush())
+        gzip_size = output_file.tell()
+    os.replace(temp_path, gzip_path)
+    return gzip_size
+
+
+# returns whether there was a file to delete
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
@@ -0,0 +1,185 @@
+import contextlib
+import functools
+import json
+import os
+import time
+
+import generate_page
+import htmlnode
+import markdown_blocks
+
+
+# times the stages of a build. install() swaps timing wrappers in for the
+# functions that make up each stage and uninstall() puts the originals back,
+# so a build that is not being profiled runs the plain functions and pays
+# nothing for the instrumentation
+class BuildProfiler:
+    def __init__(self):
+        self.stage_totals = {}
+        self.pages = {}
+        self.current_page = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.originals = []
+
+    def record(self, stage, seconds):
+        totals = self.stage_totals.setdefault(stage, {"seconds": 0.0, "calls": 0})
+        totals["seconds"] += seconds
+        totals["calls"] += 1
+
+        if self.current_page is not None:
+            page = self.pages[self.current_page]
+            page[stage] = page.get(stage, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def install(self):
+        self.wrap(
+            markdown_blocks,
+            "iter_block_lines",
+            self.timed_iterator,
+            "markdown_to_blocks",
+        )
+        self.wrap(
+            markdown_blocks,
+            "block_lines_to_block_type",
+            self.timed,
+            "block_to_block_type",
+        )
+        self.wrap(markdown_blocks, "text_to_textnodes", self.timed, "text_to_textnodes")
+        self.wrap(markdown_blocks, "write_text_nodes_html", self.timed, "to_html")
+        self.wrap(htmlnode.ParentNode, "to_html", self.timed, "to_html")
+        self.wrap(generate_page, "read_text_file", self.timed_read, "read")
+        self.wrap(generate_page, "write_text_file", self.timed_write, "write")
+        self.wrap(
+            generate_page, "write_text_file_if_changed", self.timed_write, "write"
+        )
+        self.wrap(generate_page, "generate_page", self.timed_page, "page")
+
+    def uninstall(self):
+        while self.originals:
+            owner, name, original = self.originals.pop()
+            setattr(owner, name, original)
+
+    def wrap(self, owner, name, make_wrapper, stage):
+        original = getattr(owner, name)
+        self.originals.append((owner, name, original))
+        setattr(owner, name, functools.wraps(original)(make_wrapper(original, stage)))
+
+    def timed(self, function, stage):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    # generators do their work as they are consumed, so time each step
+    def timed_iterator(self, function, stage):
+        def wrapper(*args, **kwargs):
+            iterator = function(*args, **kwargs)
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    self.record(stage, time.perf_counter() - start)
+                    return
+                self.record(stage, time.perf_counter() - start)
+                yield item
+
+        return wrapper
+
+    def timed_read(self, function, stage):
+        timed_function = self.timed(function, stage)
+
+        def wrapper(path):
+            text = timed_function(path)
+            self.bytes_read += os.path.getsize(path)
+            return text
+
+        return wrapper
+
+    def timed_write(self, function, stage):
+        timed_function = self.timed(function, stage)
+
+        # write_text_file_if_changed returns False when it left the file alone
+        def wrapper(path, text):
+            written = timed_function(path, text)
+            if written is not False:
+                self.bytes_written += os.path.getsize(path)
+            return written
+
+        return wrapper
+
+    # every stage recorded while a page is generated is also charged to it
+    def timed_page(self, function, stage):
+        def wrapper(from_path, *args, **kwargs):
+            self.current_page = str(from_path)
+            self.pages[self.current_page] = {}
+            start = time.perf_counter()
+            try:
+                return function(from_path, *args, **kwargs)
+            finally:
+                self.pages[self.current_page]["total"] = time.perf_counter() - start
+                self.current_page = None
+
+        return wrapper
+
+    def report(self, top=10):
+        stages = {}
+        for stage, totals in self.stage_totals.items():
+            stages[stage] = {
+                "seconds": totals["seconds"],
+                "calls": totals["calls"],
+                "seconds_per_page": (
+                    totals["seconds"] / len(self.pages) if self.pages else 0.0
+                ),
+            }
+
+        slowest = sorted(
+            self.pages.items(), key=lambda page: page[1]["total"], reverse=True
+        )[:top]
+        return {
+            "pages": len(self.pages),
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "stages": stages,
+            "slowest_pages": [
+                {"page": page, "stages": page_stages} for page, page_stages in slowest
+            ],
+        }
+
+
+def format_report(report):
+    lines = [
+        f"{report['pages']} pages, {report['bytes_read']} bytes read, {report['bytes_written']} bytes written",
+        "",
+        f"{'stage':<22}{'total (s)':>12}{'per page (ms)':>16}{'calls':>10}",
+    ]
+    for stage, totals in sorted(
+        report["stages"].items(), key=lambda stage: stage[1]["seconds"], reverse=True
+    ):
+        lines.append(
+            f"{stage:<22}{totals['seconds']:>12.4f}{totals['seconds_per_page'] * 1000:>16.3f}{totals['calls']:>10}"
+        )
+
+    if report["slowest_pages"]:
+        lines.append("")
+        lines.append("slowest pages:")
+        for page in report["slowest_pages"]:
+            lines.append(f"{page['stages']['total'] * 1000:10.3f} ms  {page['page']}")
+    return "\n".join(lines)
+
+
+def write_report(report, report_path):
+    with open(report_path, "w") as report_file:
+        json.dump(report, report_file, indent=2)
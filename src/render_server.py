@@ -0,0 +1,129 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+
+from batch_render import render_document
+from template import rewrite_links
+
+
+# renders requests with a parser, template and block cache that stay loaded
+# between them. a request is a json object {"markdown": ..., "page": false,
+# "id": ...}; the response echoes the id and carries "html", or "error" if
+# the markdown could not be rendered. with "page": true the html is the full
+# page built from the template instead of just the rendered markdown. either
+# way the links are rewritten for the basepath of the template, as the build
+# would write them
+class RenderServer:
+    def __init__(self, template, block_cache=None):
+        self.template = template
+        self.block_cache = block_cache
+        # the block cache is not safe to update from several threads at once
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def handle(self, request):
+        response = {}
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("request must be a json object")
+            if "id" in request:
+                response["id"] = request["id"]
+            if not isinstance(request.get("markdown"), str):
+                raise ValueError("request needs a markdown string")
+            markdown = request["markdown"]
+            template = self.template if request.get("page") else None
+            with self.lock:
+                self.requests += 1
+                html = render_document(markdown, template, self.block_cache)
+            if template is None:
+                # a page has its links rewritten by the template already
+                html = rewrite_links(
+                    html, self.template.basepath, self.template.asset_urls
+                )
+            response["html"] = html
+        except Exception as error:
+            response["error"] = str(error)
+        return response
+
+    def handle_line(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError as error:
+            return {"error": f"invalid json: {error}"}
+        return self.handle(request)
+
+
+# answer one json line with one json line until infile is exhausted
+def serve_lines(server, infile, outfile):
+    for line in infile:
+        if not line.strip():
+            continue
+        outfile.write(json.dumps(server.handle_line(line)) + "\n")
+        outfile.flush()
+
+
+class RenderRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.render_server.handle_line(line)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class RenderSocketServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, render_server):
+        remove_stale_socket(socket_path)
+        super().__init__(socket_path, RenderRequestHandler)
+        self.render_server = render_server
+
+    def server_close(self):
+        super().server_close()
+        remove_stale_socket(self.server_address)
+
+
+# a socket left behind by a previous server would make bind fail. anything
+# else at the path is somebody's file and is never deleted
+def remove_stale_socket(socket_path):
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise Exception(f"not a socket, refusing to replace it: {socket_path}")
+    os.remove(socket_path)
+
+
+# a minimal client for the unix socket, as a cms integration would use it.
+# the connection is kept open across requests
+class RenderClient:
+    def __init__(self, socket_path):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(socket_path)
+        self.file = self.socket.makefile("rwb")
+
+    def request(self, request):
+        self.file.write(json.dumps(request).encode() + b"\n")
+        self.file.flush()
+        return json.loads(self.file.readline())
+
+    def render(self, markdown, page=False):
+        response = self.request({"markdown": markdown, "page": page})
+        if "error" in response:
+            raise Exception(response["error"])
+        return response["html"]
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,127 @@
+import re
+
+TEMPLATE_SLOT_PATTERN = re.compile(r"\{\{ (Title|Content) \}\}")
+
+# a root-relative link or image, up to any query string or fragment
+ASSET_LINK_PATTERN = re.compile(r'(href|src)="(/[^"?#]*)')
+
+
+def rewrite_basepath(html, basepath):
+    # root-relative links and images are served from under the basepath
+    if basepath == "/":
+        return html
+    return html.replace('href="/', 'href="' + basepath).replace(
+        'src="/', 'src="' + basepath
+    )
+
+
+# point root-relative links and images at the fingerprinted names in
+# asset_urls, which maps urls of static files to their fingerprinted urls
+def rewrite_asset_urls(html, asset_urls):
+    if not asset_urls:
+        return html
+    return ASSET_LINK_PATTERN.sub(
+        lambda match: f'{match[1]}="{asset_urls.get(match[2], match[2])}', html
+    )
+
+
+def rewrite_links(html, basepath, asset_urls=None):
+    return rewrite_basepath(rewrite_asset_urls(html, asset_urls), basepath)
+
+
+# a template compiled once per build: the document is pre-split into literal
+# segments (already rewritten for the basepath) and the {{ Title }} and
+# {{ Content }} slots between them, so rendering a page is a single join.
+# with asset_urls, links to static files are rewritten to their fingerprinted
+# names in the template and in every page rendered with it
+class Template:
+    def __init__(self, template_doc: str, basepath: str = "/", asset_urls=None):
+        self.basepath = basepath
+        self.asset_urls = asset_urls
+        self.segments = []
+        self.slots = []
+
+        parts = TEMPLATE_SLOT_PATTERN.split(template_doc)
+        # re.split with a capture group alternates literal, slot, literal, ...
+        for i in range(len(parts)):
+            if i % 2 == 0:
+                self.segments.append(rewrite_links(parts[i], basepath, asset_urls))
+            else:
+                self.slots.append((len(self.segments), parts[i]))
+                self.segments.append(None)
+
+    def render(self, title: str, content: str) -> str:
+        values = {
+            "Title": rewrite_links(title, self.basepath, self.asset_urls),
+            "Content": rewrite_links(content, self.basepath, self.asset_urls),
+        }
+        pieces = list(self.segments)
+        for index, name in self.slots:
+            pieces[index] = values[name]
+        return "".join(pieces)
+
+    # stream the page into out instead of building it in memory. write_content
+    # is called with a writer for each {{ Content }} slot and writes the page
+    # content through it piece by piece
+    def write(self, out, title: str, write_content):
+        slot_names = dict(self.slots)
+        content_out = BasepathWriter(out, self.basepath, self.asset_urls)
+        for i in range(len(self.segments)):
+            if self.segments[i] is not None:
+                out.write(self.segments[i])
+            elif slot_names[i] == "Title":
+                out.write(rewrite_links(title, self.basepath, self.asset_urls))
+            else:
+                write_content(content_out)
+
+    # the inverse of render: cut the content back out of a rendered page by
+    # matching the literal segments around the first {{ Content }} slot.
+    # returns None if the page was not rendered from this template
+    def extract_content(self, page_html):
+        content_indexes = [index for index, name in self.slots if name == "Content"]
+        if not content_indexes:
+            return None
+
+        start = 0
+        for segment in self.segments[: content_indexes[0]]:
+            if segment:
+                found = page_html.find(segment, start)
+                if found == -1:
+                    return None
+                start = found + len(segment)
+
+        end = len(page_html)
+        for segment in reversed(self.segments[content_indexes[0] + 1 :]):
+            if segment:
+                found = page_html.rfind(segment, start, end)
+                if found == -1:
+                    return None
+                end = found
+        return page_html[start:end]
+
+    def __eq__(self, other):
+        return (
+            self.segments == other.segments
+            and self.basepath == other.basepath
+            and self.asset_urls == other.asset_urls
+        )
+
+    def __repr__(self):
+        return f"Template({self.basepath}, {self.segments})"
+
+
+# rewrites each piece written through it. the html writers emit every tag
+# (with its attributes) as a single piece, so no link is split across writes
+class BasepathWriter:
+    def __init__(self, out, basepath, asset_urls=None):
+        self.out = out
+        self.basepath = basepath
+        self.asset_urls = asset_urls
+
+    def write(self, text):
+        return self.out.write(rewrite_links(text, self.basepath, self.asset_urls))
+
+
+def load_template(template_path, basepath="/", asset_urls=None):
+    with open(template_path) as template_file:
+        return Template(template_file.read(), basepath, asset_urls)
@@ -0,0 +1,63 @@
+import unittest
+
+from batch_render import iter_chunks, render_batch
+from block_cache import BlockCache
+from markdown_blocks import markdown_to_html_node
+from template import Template
+
+DOCUMENTS = [
+    f"# Note {i}\n\nSome **bold** text and a [link](/notes/{i})\n\n- shared item"
+    for i in range(50)
+]
+
+
+class TestRenderBatch(unittest.TestCase):
+    def test_matches_single_document_rendering(self):
+        expected = [markdown_to_html_node(doc).to_html() for doc in DOCUMENTS]
+        self.assertEqual(list(render_batch(DOCUMENTS)), expected)
+
+    def test_accepts_any_iterable(self):
+        documents = (doc for doc in DOCUMENTS[:3])
+        self.assertEqual(len(list(render_batch(documents))), 3)
+
+    def test_template_renders_full_pages(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}", "/blog/")
+        pages = list(render_batch(DOCUMENTS[:2], template))
+        self.assertTrue(pages[0].startswith("<title>Note 0</title><div>"))
+        self.assertIn('href="/blog/notes/1"', pages[1])
+
+    def test_block_cache_is_shared_across_documents(self):
+        block_cache = BlockCache()
+        list(render_batch(DOCUMENTS, block_cache=block_cache))
+        # every document repeats the "- shared item" block
+        self.assertGreaterEqual(block_cache.hits, len(DOCUMENTS) - 1)
+
+    def test_parallel_keeps_input_order(self):
+        expected = list(render_batch(DOCUMENTS))
+        self.assertEqual(list(render_batch(DOCUMENTS, jobs=2, chunk_size=7)), expected)
+
+    def test_parallel_with_template_and_cache(self):
+        template = Template("<h1>{{ Title }}</h1>{{ Content }}")
+        expected = list(render_batch(DOCUMENTS, template))
+        self.assertEqual(
+            list(
+                render_batch(DOCUMENTS, template, BlockCache(), jobs=2, chunk_size=10)
+            ),
+            expected,
+        )
+
+    def test_parallel_error_is_raised(self):
+        with self.assertRaises(Exception):
+            list(render_batch(["**unclosed"], jobs=2))
+
+
+class TestIterChunks(unittest.TestCase):
+    def test_splits_into_chunks(self):
+        self.assertEqual(list(iter_chunks(range(7), 3)), [[0, 1, 2], [3, 4, 5], [6]])
+
+    def test_empty(self):
+        self.assertEqual(list(iter_chunks([], 3)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+from block_cache import (
+    BlockCache,
+    block_cache_key,
+    load_block_cache,
+    save_block_cache,
+)
+from markdown_blocks import markdown_to_html, markdown_to_html_node
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_get_missing_counts_a_miss(self):
+        cache = BlockCache()
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+    def test_put_and_get(self):
+        cache = BlockCache()
+        cache.put("k", "<p>x</p>")
+        self.assertEqual(cache.get("k"), "<p>x</p>")
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_evicts_least_recently_used(self):
+        cache = BlockCache(max_size=10)
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        cache.get("a")
+        cache.put("c", "cccc")
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        self.assertEqual(cache.size, 8)
+
+    def test_replacing_an_entry_updates_size(self):
+        cache = BlockCache()
+        cache.put("a", "aaaa")
+        cache.put("a", "aa")
+        self.assertEqual(cache.size, 2)
+
+    def test_key_depends_on_lines(self):
+        self.assertEqual(block_cache_key(["a", "b"]), block_cache_key(["a", "b"]))
+        self.assertNotEqual(block_cache_key(["a", "b"]), block_cache_key(["a b"]))
+
+
+class TestBlockCachePersistence(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, ".build", "block-cache.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_keeps_lru_order(self):
+        cache = BlockCache()
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        save_block_cache(cache, self.path)
+        loaded = load_block_cache(self.path)
+        self.assertEqual(list(loaded.entries.items()), [("b", "2"), ("a", "1")])
+
+    def test_load_applies_size_bound(self):
+        cache = BlockCache()
+        cache.put("a", "1111")
+        cache.put("b", "2222")
+        save_block_cache(cache, self.path)
+        self.assertEqual(list(load_block_cache(self.path, max_size=4).entries), ["b"])
+
+    def test_missing_or_corrupt_cache_is_empty(self):
+        self.assertEqual(len(load_block_cache(self.path)), 0)
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as file:
+            file.write("{")
+        self.assertEqual(len(load_block_cache(self.path)), 0)
+
+
+class TestCachedRendering(unittest.TestCase):
+    MARKDOWN = "# Title\n\nFirst **paragraph**\n\n- a\n- b\n\n```\ncode\n```\n"
+
+    def test_matches_uncached_rendering(self):
+        cache = BlockCache()
+        expected = markdown_to_html_node(self.MARKDOWN).to_html()
+        self.assertEqual(markdown_to_html(self.MARKDOWN, cache), expected)
+        self.assertEqual(markdown_to_html(self.MARKDOWN, cache), expected)
+        self.assertEqual((cache.hits, cache.misses), (4, 4))
+
+    def test_only_edited_block_is_rendered(self):
+        cache = BlockCache()
+        markdown_to_html(self.MARKDOWN, cache)
+        edited = self.MARKDOWN.replace("First", "Edited")
+        html = markdown_to_html(edited, cache)
+        self.assertIn("<p>Edited <b>paragraph</b></p>", html)
+        self.assertEqual((cache.hits, cache.misses), (3, 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
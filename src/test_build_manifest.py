@@ -0,0 +1,209 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from build_manifest import (
+    empty_manifest,
+    hash_file,
+    load_manifest,
+    load_versioned_json,
+    save_manifest,
+    save_versioned_json,
+)
+from fixtures import write_file
+from generate_page import (
+    find_pages,
+    generate_pages_incremental,
+    remove_stale_outputs,
+)
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_missing_manifest_is_empty(self):
+        path = os.path.join(self.root, "nope.json")
+        self.assertEqual(load_manifest(path), empty_manifest())
+
+    def test_corrupt_manifest_is_empty(self):
+        path = os.path.join(self.root, "manifest.json")
+        write_file(path, "{not json")
+        self.assertEqual(load_manifest(path), empty_manifest())
+
+    def test_save_and_load_round_trip(self):
+        path = os.path.join(self.root, "build", "manifest.json")
+        manifest = empty_manifest()
+        manifest["outputs"]["docs/index.html"] = {"source_hash": "abc"}
+        save_manifest(manifest, path)
+        self.assertEqual(load_manifest(path), manifest)
+        self.assertFalse(os.path.exists(f"{path}.tmp"))
+
+    def test_hash_file_changes_with_content(self):
+        path = os.path.join(self.root, "a.md")
+        write_file(path, "one")
+        first = hash_file(path)
+        write_file(path, "two")
+        self.assertNotEqual(first, hash_file(path))
+
+
+class TestVersionedJSON(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, ".build", "state.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        self.assertTrue(save_versioned_json({"entries": [1, 2]}, self.path, 3))
+        self.assertEqual(
+            load_versioned_json(self.path, 3), {"version": 3, "entries": [1, 2]}
+        )
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_missing_corrupt_or_other_version_is_none(self):
+        self.assertIsNone(load_versioned_json(self.path, 1))
+        save_versioned_json({}, self.path, 2)
+        self.assertIsNone(load_versioned_json(self.path, 1))
+        write_file(self.path, "{not json")
+        self.assertIsNone(load_versioned_json(self.path, 1))
+        write_file(self.path, "[1]")
+        self.assertIsNone(load_versioned_json(self.path, 1))
+
+    def test_only_if_changed(self):
+        save_versioned_json({"a": 1}, self.path, 1)
+        os.utime(self.path, ns=(0, 0))
+        self.assertFalse(
+            save_versioned_json({"a": 1}, self.path, 1, only_if_changed=True)
+        )
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+        self.assertTrue(
+            save_versioned_json({"a": 2}, self.path, 1, only_if_changed=True)
+        )
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest = os.path.join(self.root, ".build", "manifest.json")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "post", "index.md"), "# Post")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, basepath="/", asset_urls=None, changed_files=None):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            generate_pages_incremental(
+                self.content,
+                self.template,
+                self.dest,
+                basepath,
+                self.manifest,
+                changed_files=changed_files,
+                asset_urls=asset_urls,
+            )
+        return output.getvalue()
+
+    def test_find_pages_maps_md_to_html(self):
+        pages = [(str(s), str(d)) for s, d in find_pages(self.content, self.dest)]
+        self.assertEqual(
+            pages,
+            [
+                (
+                    os.path.join(self.content, "blog", "post", "index.md"),
+                    os.path.join(self.dest, "blog", "post", "index.html"),
+                ),
+                (
+                    os.path.join(self.content, "index.md"),
+                    os.path.join(self.dest, "index.html"),
+                ),
+            ],
+        )
+
+    def test_first_build_renders_everything(self):
+        self.assertIn("rendered 2 of 2 pages", self.build())
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_unchanged_build_renders_nothing(self):
+        self.build()
+        self.assertIn("rendered 0 of 2 pages", self.build())
+
+    def test_only_changed_page_is_rendered(self):
+        self.build()
+        write_file(os.path.join(self.content, "index.md"), "# New Home")
+        self.assertIn("rendered 1 of 2 pages", self.build())
+        with open(os.path.join(self.dest, "index.html")) as file:
+            self.assertIn("New Home", file.read())
+
+    def test_template_change_renders_everything(self):
+        self.build()
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertIn("rendered 2 of 2 pages", self.build())
+
+    def test_basepath_change_renders_everything(self):
+        self.build()
+        self.assertIn("rendered 2 of 2 pages", self.build("/site/"))
+
+    def test_asset_fingerprint_change_renders_everything(self):
+        self.build(asset_urls={"/index.css": "/index.1.css"})
+        self.assertIn(
+            "rendered 0 of 2 pages",
+            self.build(asset_urls={"/index.css": "/index.1.css"}),
+        )
+        self.assertIn(
+            "rendered 2 of 2 pages",
+            self.build(asset_urls={"/index.css": "/index.2.css"}),
+        )
+
+    def test_deleted_output_is_rendered_again(self):
+        self.build()
+        os.remove(os.path.join(self.dest, "index.html"))
+        self.assertIn("rendered 1 of 2 pages", self.build())
+
+    def test_removed_source_deletes_output_and_empty_dirs(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        self.assertIn("removed 1 stale outputs", self.build())
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_removed_source_is_listed_as_changed(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        changed_files = []
+        self.build(changed_files=changed_files)
+        self.assertEqual(
+            changed_files, [os.path.join(self.dest, "blog", "post", "index.html")]
+        )
+
+    def test_remove_stale_outputs_keeps_current_pages(self):
+        self.build()
+        current = os.path.join(self.dest, "index.html")
+        stale = os.path.join(self.dest, "blog", "post", "index.html")
+        changed_files = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            removed = remove_stale_outputs(
+                [current, stale], {current}, self.dest, changed_files
+            )
+        self.assertEqual(removed, 1)
+        self.assertEqual(changed_files, [stale])
+        self.assertTrue(os.path.exists(current))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+
+
+if __name__ == "__main__":
+    unittest.main()
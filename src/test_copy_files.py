@@ -0,0 +1,225 @@
+import contextlib
+import io
+import os
+import tempfile
+import stat
+import unittest
+from unittest import mock
+
+import copy_files as copy_files_module
+from copy_files import (
+    copy_file,
+    copy_files,
+    copy_files_parallel,
+    reflink_file,
+    sync_files,
+)
+from fixtures import read_file, read_tree, write_file
+
+
+class TestCopyFilesParallel(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.static = os.path.join(self.root, "static")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        for i in range(20):
+            write_file(os.path.join(self.static, "images", f"{i}.png"), "x" * i)
+        write_file(os.path.join(self.static, "a", "b", "c.txt"), "deep")
+        os.makedirs(os.path.join(self.static, "empty"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_matches_serial_copy(self):
+        serial = os.path.join(self.root, "serial")
+        parallel = os.path.join(self.root, "parallel")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            copy_files(self.static, serial)
+            summary = copy_files_parallel(self.static, parallel, workers=4)
+        self.assertEqual(read_tree(parallel), read_tree(serial))
+        self.assertTrue(os.path.isdir(os.path.join(parallel, "empty")))
+        self.assertEqual(summary, (22, 7 + sum(range(20)) + 4))
+
+    def test_replaces_existing_destination(self):
+        dest = os.path.join(self.root, "docs")
+        write_file(os.path.join(dest, "stale.txt"), "old")
+        with contextlib.redirect_stdout(io.StringIO()):
+            copy_files_parallel(self.static, dest)
+        self.assertFalse(os.path.exists(os.path.join(dest, "stale.txt")))
+
+    def test_prints_a_single_summary(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            copy_files_parallel(self.static, os.path.join(self.root, "docs"))
+        self.assertEqual(len(output.getvalue().splitlines()), 1)
+        self.assertIn("copied 22 files", output.getvalue())
+
+    def test_missing_source_raises(self):
+        with self.assertRaises(Exception) as cm:
+            copy_files_parallel(os.path.join(self.root, "nope"), self.root)
+        self.assertIn("source path does not exist", str(cm.exception))
+
+
+class TestSyncFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.manifest = os.path.join(self.root, ".build", "manifest.json")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "a.png"), "png bytes")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self, **kwargs):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            sync_files(self.static, self.dest, self.manifest, **kwargs)
+        return output.getvalue()
+
+    def test_first_sync_copies_everything(self):
+        self.assertIn("synced 2 of 2 files", self.sync())
+        self.assertEqual(read_file(os.path.join(self.dest, "index.css")), "body {}")
+        self.assertEqual(
+            read_file(os.path.join(self.dest, "images", "a.png")), "png bytes"
+        )
+
+    def test_unchanged_files_are_skipped(self):
+        self.sync()
+        self.assertIn("synced 0 of 2 files", self.sync())
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        write_file(os.path.join(self.static, "index.css"), "body { color: red }")
+        self.assertIn("synced 1 of 2 files", self.sync())
+        self.assertEqual(
+            read_file(os.path.join(self.dest, "index.css")), "body { color: red }"
+        )
+
+    def test_same_content_with_new_mtime_is_skipped_with_hash(self):
+        self.sync()
+        source = os.path.join(self.static, "index.css")
+        os.utime(source, ns=(0, 0))
+        self.assertIn("synced 0 of 2 files", self.sync(compare_hash=True))
+        self.assertIn("synced 0 of 2 files", self.sync())
+
+    def test_returns_the_transferred_and_removed_files(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(
+                sorted(sync_files(self.static, self.dest, self.manifest)),
+                [
+                    os.path.join(self.dest, "images", "a.png"),
+                    os.path.join(self.dest, "index.css"),
+                ],
+            )
+            write_file(os.path.join(self.static, "index.css"), "body { color: red }")
+            os.remove(os.path.join(self.static, "images", "a.png"))
+            self.assertEqual(
+                sorted(sync_files(self.static, self.dest, self.manifest)),
+                [
+                    os.path.join(self.dest, "images", "a.png"),
+                    os.path.join(self.dest, "index.css"),
+                ],
+            )
+            self.assertEqual(sync_files(self.static, self.dest, self.manifest), [])
+
+    def test_only_orphaned_assets_are_removed(self):
+        self.sync()
+        page = os.path.join(self.dest, "blog", "index.html")
+        write_file(page, "<p>generated</p>")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.assertIn("removed 1 orphaned files", self.sync())
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertTrue(os.path.exists(page))
+
+    def test_hardlink_mode_shares_the_inode(self):
+        self.sync(link_mode="hardlink")
+        source = os.stat(os.path.join(self.static, "index.css"))
+        destination = os.stat(os.path.join(self.dest, "index.css"))
+        self.assertTrue(os.path.samestat(source, destination))
+        self.assertIn("synced 0 of 2 files", self.sync(link_mode="hardlink"))
+
+    def test_reflink_mode_produces_identical_files(self):
+        self.sync(link_mode="reflink")
+        self.assertEqual(read_file(os.path.join(self.dest, "index.css")), "body {}")
+        self.assertIn("synced 0 of 2 files", self.sync(link_mode="reflink"))
+
+    def test_parallel_sync(self):
+        self.assertIn("synced 2 of 2 files", self.sync(workers=4))
+        self.assertIn("synced 0 of 2 files", self.sync(workers=4))
+
+    def test_unknown_link_mode_raises(self):
+        with self.assertRaises(ValueError):
+            self.sync(link_mode="symlink")
+
+
+class TestReflinkFile(unittest.TestCase):
+    def test_clones_content(self):
+        with tempfile.TemporaryDirectory() as root:
+            source = os.path.join(root, "a.bin")
+            destination = os.path.join(root, "b.bin")
+            with open(source, "wb") as file:
+                file.write(os.urandom(300000))
+            try:
+                reflink_file(source, destination)
+            except OSError:
+                self.skipTest("reflinks are not supported here")
+            with open(source, "rb") as a, open(destination, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+
+
+class TestCopyFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "a.bin")
+        self.destination = os.path.join(self.tmp.name, "b.bin")
+        self.data = os.urandom(300000)
+        with open(self.source, "wb") as file:
+            file.write(self.data)
+        os.chmod(self.source, 0o640)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assert_copied(self):
+        with open(self.destination, "rb") as file:
+            self.assertEqual(file.read(), self.data)
+        self.assertEqual(stat.S_IMODE(os.stat(self.destination).st_mode), 0o640)
+
+    def test_copies_content_and_mode(self):
+        copy_file(self.source, self.destination)
+        self.assert_copied()
+
+    def test_empty_file(self):
+        self.data = b""
+        with open(self.source, "wb"):
+            pass
+        copy_file(self.source, self.destination)
+        self.assert_copied()
+
+    def test_each_kernel_copy_alone(self):
+        for kernel_copy in copy_files_module.KERNEL_COPIES:
+            with mock.patch.object(copy_files_module, "KERNEL_COPIES", [kernel_copy]):
+                copy_file(self.source, self.destination)
+            self.assert_copied()
+
+    def test_falls_back_after_a_partial_kernel_copy(self):
+        def copy_some_then_fail(source_fd, destination_fd, offset, count):
+            if offset > 0:
+                raise OSError("not supported")
+            os.pwrite(destination_fd, os.pread(source_fd, 1000, 0), 0)
+            return 1000
+
+        with mock.patch.object(
+            copy_files_module, "KERNEL_COPIES", [copy_some_then_fail]
+        ):
+            copy_file(self.source, self.destination)
+        self.assert_copied()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import xml.dom.minidom
+
+from feeds import build_sitemap, find_sections, page_url, write_feeds
+from fixtures import write_file
+from template import Template
+
+
+def metadata(title, date=None, draft=False, tags=()):
+    return {
+        "source": "",
+        "title": title,
+        "date": date,
+        "tags": list(tags),
+        "draft": draft,
+        "layout": None,
+    }
+
+
+class TestPageURL(unittest.TestCase):
+    def test_urls(self):
+        self.assertEqual(page_url("docs/index.html", "docs", "/"), "/")
+        self.assertEqual(
+            page_url("docs/blog/tom/index.html", "docs", "/site/"), "/site/blog/tom/"
+        )
+        self.assertEqual(
+            page_url("docs/about.html", "docs", "/", "https://example.com/"),
+            "https://example.com/about.html",
+        )
+
+
+class TestFeeds(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = os.path.join(self.tmp.name, "docs")
+        self.template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.page_index = {}
+        self.add_page("index.html", metadata("Home"))
+        self.add_page("blog/index.html", metadata("The Blog"))
+        self.add_page(
+            "blog/old/index.html", metadata("Old & gold", "2023-01-01", tags=["a"])
+        )
+        self.add_page("blog/new/index.html", metadata("New", "2024-06-01T12:00:00"))
+        self.add_page("blog/secret/index.html", metadata("Secret", draft=True))
+        self.add_page("contact/index.html", metadata("Contact"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add_page(self, relative_path, page_metadata):
+        dest_path = os.path.join(self.dest, relative_path)
+        content = f"<div><h1>{page_metadata['title']}</h1></div>"
+        write_file(dest_path, self.template.render(page_metadata["title"], content))
+        self.page_index[dest_path] = page_metadata
+
+    def write_feeds(self, changed_files=None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return write_feeds(
+                self.page_index,
+                self.dest,
+                "/",
+                self.template,
+                "https://example.com",
+                changed_files,
+            )
+
+    def test_sitemap_lists_published_pages(self):
+        sitemap = build_sitemap(self.page_index, self.dest, "/", "https://example.com")
+        xml.dom.minidom.parseString(sitemap)
+        self.assertIn("<loc>https://example.com/blog/old/</loc>", sitemap)
+        self.assertIn("<lastmod>2023-01-01</lastmod>", sitemap)
+        self.assertNotIn("secret", sitemap)
+
+    def test_sections_need_entries(self):
+        sections = find_sections(self.page_index, self.dest)
+        self.assertEqual(list(sections), ["blog"])
+        self.assertEqual(sections["blog"]["landing"][1]["title"], "The Blog")
+        self.assertEqual(len(sections["blog"]["entries"]), 2)
+
+    def test_feed_reuses_rendered_content(self):
+        outputs = self.write_feeds()
+        feed_path = os.path.join(self.dest, "blog", "feed.xml")
+        self.assertEqual(
+            outputs, sorted([feed_path, os.path.join(self.dest, "sitemap.xml")])
+        )
+
+        document = xml.dom.minidom.parse(feed_path)
+        entries = document.getElementsByTagName("entry")
+        titles = [
+            entry.getElementsByTagName("title")[0].firstChild.data for entry in entries
+        ]
+        self.assertEqual(titles, ["New", "Old & gold"])
+        content = entries[1].getElementsByTagName("content")[0].firstChild.data
+        self.assertEqual(content, "<div><h1>Old & gold</h1></div>")
+        updated = document.getElementsByTagName("updated")[0].firstChild.data
+        self.assertEqual(updated, "2024-06-01T12:00:00Z")
+
+    def test_site_url_is_required(self):
+        with self.assertRaises(ValueError):
+            write_feeds(self.page_index, self.dest, "/", self.template, "")
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "sitemap.xml")))
+
+    def test_unchanged_feeds_are_not_rewritten(self):
+        changed_files = []
+        self.write_feeds(changed_files)
+        self.assertEqual(len(changed_files), 2)
+        changed_files = []
+        self.write_feeds(changed_files)
+        self.assertEqual(changed_files, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
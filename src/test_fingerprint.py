@@ -0,0 +1,127 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from fingerprint import (
+    FINGERPRINT_LENGTH,
+    fingerprint_assets,
+    fingerprinted_name,
+    hash_asset_urls,
+    load_asset_manifest,
+)
+from fixtures import write_file
+
+
+class TestFingerprintedName(unittest.TestCase):
+    def test_hash_goes_before_the_extension(self):
+        self.assertEqual(
+            fingerprinted_name(os.path.join("images", "tom.png"), "0123456789abcdef"),
+            os.path.join(
+                "images", f"tom.{'0123456789abcdef'[:FINGERPRINT_LENGTH]}.png"
+            ),
+        )
+
+    def test_file_without_extension(self):
+        self.assertEqual(
+            fingerprinted_name("LICENSE", "abcdef0123456789"), "LICENSE.abcdef0123"
+        )
+
+
+class TestFingerprintAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.static = os.path.join(self.root, "static")
+        self.docs = os.path.join(self.root, "docs")
+        self.manifest = os.path.join(self.root, ".build", "assets.json")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "tom.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def fingerprint(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            urls = fingerprint_assets(self.static, self.docs, self.manifest)
+        return urls, output.getvalue()
+
+    def test_files_are_published_under_fingerprinted_names(self):
+        urls, _ = self.fingerprint()
+        self.assertEqual(sorted(urls), ["/images/tom.png", "/index.css"])
+        for url, fingerprinted_url in urls.items():
+            self.assertRegex(fingerprinted_url, r"^/.*\.[0-9a-f]{10}\.(css|png)$")
+            with (
+                open(self.static + url) as source,
+                open(self.docs + fingerprinted_url) as published,
+            ):
+                self.assertEqual(published.read(), source.read())
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css")))
+
+    def test_unchanged_files_reuse_their_hashes(self):
+        urls, _ = self.fingerprint()
+        second_urls, output = self.fingerprint()
+        self.assertEqual(second_urls, urls)
+        self.assertIn("hashed 0, copied 0, removed 0", output)
+
+    def test_missing_output_is_copied_without_rehashing(self):
+        urls, _ = self.fingerprint()
+        os.remove(self.docs + urls["/index.css"])
+        _, output = self.fingerprint()
+        self.assertIn("hashed 0, copied 1", output)
+        self.assertTrue(os.path.exists(self.docs + urls["/index.css"]))
+
+    def test_changed_file_gets_a_new_name_and_the_old_one_is_removed(self):
+        urls, _ = self.fingerprint()
+        write_file(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        new_urls, output = self.fingerprint()
+        self.assertIn("hashed 1, copied 1, removed 1", output)
+        self.assertNotEqual(new_urls["/index.css"], urls["/index.css"])
+        self.assertEqual(new_urls["/images/tom.png"], urls["/images/tom.png"])
+        self.assertFalse(os.path.exists(self.docs + urls["/index.css"]))
+        with open(self.docs + new_urls["/index.css"]) as file:
+            self.assertEqual(file.read(), "body { margin: 0 }")
+        self.assertNotEqual(hash_asset_urls(new_urls), hash_asset_urls(urls))
+
+    def test_copied_and_removed_files_are_reported(self):
+        changed_files = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            urls = fingerprint_assets(
+                self.static, self.docs, self.manifest, changed_files=changed_files
+            )
+            self.assertEqual(
+                sorted(changed_files),
+                sorted(self.docs + url for url in urls.values()),
+            )
+
+            write_file(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+            changed_files = []
+            new_urls = fingerprint_assets(
+                self.static, self.docs, self.manifest, changed_files=changed_files
+            )
+        self.assertEqual(
+            sorted(changed_files),
+            sorted(
+                [self.docs + new_urls["/index.css"], self.docs + urls["/index.css"]]
+            ),
+        )
+
+    def test_removed_file_is_dropped(self):
+        urls, _ = self.fingerprint()
+        os.remove(os.path.join(self.static, "images", "tom.png"))
+        new_urls, _ = self.fingerprint()
+        self.assertEqual(sorted(new_urls), ["/index.css"])
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images")))
+        self.assertEqual(sorted(load_asset_manifest(self.manifest)), ["index.css"])
+
+    def test_corrupt_manifest_is_rehashed(self):
+        write_file(self.manifest, "{not json")
+        self.assertEqual(load_asset_manifest(self.manifest), {})
+        _, output = self.fingerprint()
+        self.assertIn("hashed 2", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
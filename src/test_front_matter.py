@@ -0,0 +1,114 @@
+import unittest
+
+from front_matter import (
+    page_metadata,
+    parse_front_matter,
+    read_front_matter_lines,
+    split_front_matter,
+)
+
+DOCUMENT = """---
+title: Fellowship
+date: 2024-03-01
+tags: [tolkien, books]
+draft: yes
+layout: post
+---
+# Heading
+
+Body text"""
+
+
+class TestSplitFrontMatter(unittest.TestCase):
+    def test_splits_front_matter_from_body(self):
+        metadata, body = split_front_matter(DOCUMENT)
+        self.assertEqual(
+            metadata,
+            {
+                "title": "Fellowship",
+                "date": "2024-03-01",
+                "tags": ["tolkien", "books"],
+                "draft": True,
+                "layout": "post",
+            },
+        )
+        self.assertEqual(body, "# Heading\n\nBody text")
+
+    def test_document_without_front_matter(self):
+        self.assertEqual(split_front_matter("# Title\n---\n"), ({}, "# Title\n---\n"))
+
+    def test_empty_front_matter(self):
+        self.assertEqual(split_front_matter("---\n---\n# Title"), ({}, "# Title"))
+
+    def test_front_matter_only(self):
+        self.assertEqual(
+            split_front_matter("---\ntitle: Only\n---"), ({"title": "Only"}, "")
+        )
+
+    def test_unclosed_front_matter_raises(self):
+        with self.assertRaises(Exception) as cm:
+            split_front_matter("---\ntitle: Open\n# Title")
+        self.assertEqual(str(cm.exception), "front matter is not closed")
+
+
+class TestReadFrontMatterLines(unittest.TestCase):
+    def test_matches_split_front_matter(self):
+        metadata, size = read_front_matter_lines(iter(DOCUMENT.split("\n")))
+        self.assertEqual(metadata, split_front_matter(DOCUMENT)[0])
+        self.assertEqual(DOCUMENT.split("\n")[size:], ["# Heading", "", "Body text"])
+
+    def test_no_front_matter(self):
+        self.assertEqual(read_front_matter_lines(["# Title", "text"]), ({}, 0))
+
+    def test_unclosed_front_matter_raises(self):
+        with self.assertRaises(Exception):
+            read_front_matter_lines(["---", "title: x"])
+
+
+class TestParseFrontMatter(unittest.TestCase):
+    def test_values(self):
+        self.assertEqual(
+            parse_front_matter(
+                [
+                    "# a comment",
+                    "",
+                    'title: "Quoted: title"',
+                    "tags: a, b ,,c",
+                    "draft: False",
+                    "date: 2024-03-01T10:30:00",
+                    "author: Sam",
+                ]
+            ),
+            {
+                "title": "Quoted: title",
+                "tags": ["a", "b", "c"],
+                "draft": False,
+                "date": "2024-03-01T10:30:00",
+                "author": "Sam",
+            },
+        )
+
+    def test_invalid_values_raise(self):
+        for line in ["date: yesterday", "draft: maybe", "no separator"]:
+            with self.assertRaises(Exception):
+                parse_front_matter([line])
+
+
+class TestPageMetadata(unittest.TestCase):
+    def test_fills_in_defaults(self):
+        self.assertEqual(
+            page_metadata("content/index.md", {"title": "Home", "author": "Sam"}),
+            {
+                "source": "content/index.md",
+                "title": "Home",
+                "date": None,
+                "tags": [],
+                "draft": False,
+                "layout": None,
+                "author": "Sam",
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,24 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
 import unittest
+from unittest import mock
 
-from generate_page import extract_title
+import generate_page as generate_page_module
+from fixtures import read_tree, write_file
+from generate_page import (
+    extract_title,
+    generate_page,
+    generate_page_streaming,
+    generate_pages_parallel,
+    generate_pages_pipelined,
+    generate_pages_recursive,
+    iter_mapped_lines,
+    write_text_file,
+    write_text_file_if_changed,
+)
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -30,6 +48,10 @@ More text
 """
         self.assertEqual(extract_title(md), "First Title")
 
+    def test_heading_inside_a_code_block_is_not_the_title(self):
+        md = "```\n# not a title\n```\n\n# Real Title"
+        self.assertEqual(extract_title(md), "Real Title")
+
     def test_raises_when_no_title(self):
         md = """
 No headers here
@@ -39,5 +61,303 @@ No headers here
         self.assertEqual(str(cm.exception), "no title found")
 
 
+class TestParallelBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        write_file(
+            self.template,
+            '<title>{{ Title }}</title><link href="/index.css">{{ Content }}',
+        )
+        for i in range(8):
+            write_file(
+                os.path.join(self.content, f"section{i % 3}", f"page{i}", "index.md"),
+                f"# Page {i}\n\nSome **bold** text and a [link](/page{i}).",
+            )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parallel_output_matches_serial(self):
+        serial = os.path.join(self.root, "serial")
+        parallel = os.path.join(self.root, "parallel")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, serial, "/site/")
+            generate_pages_parallel(
+                self.content, self.template, parallel, "/site/", jobs=3
+            )
+        self.assertEqual(read_tree(serial), read_tree(parallel))
+        self.assertEqual(len(read_tree(parallel)), 8)
+
+    def test_failures_are_reported_per_file(self):
+        write_file(os.path.join(self.content, "broken", "index.md"), "no title")
+        dest = os.path.join(self.root, "docs")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            with self.assertRaises(Exception) as cm:
+                generate_pages_parallel(self.content, self.template, dest, "/", 2)
+        self.assertEqual(str(cm.exception), "1 of 9 pages failed to generate")
+        self.assertIn("broken", output.getvalue())
+        self.assertEqual(len(read_tree(dest)), 8)
+
+    def test_pipelined_output_matches_serial(self):
+        serial = os.path.join(self.root, "serial")
+        pipelined = os.path.join(self.root, "pipelined")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, serial, "/site/")
+            generate_pages_pipelined(self.content, self.template, pipelined, "/site/")
+        self.assertEqual(read_tree(serial), read_tree(pipelined))
+
+    def test_pipelined_with_small_queues_and_streamed_pages(self):
+        serial = os.path.join(self.root, "serial")
+        pipelined = os.path.join(self.root, "pipelined")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, serial, "/")
+            with (
+                mock.patch.object(generate_page_module, "PIPELINE_QUEUE_SIZE", 1),
+                mock.patch.object(generate_page_module, "STREAMING_THRESHOLD", 40),
+            ):
+                generate_pages_pipelined(self.content, self.template, pipelined, "/")
+        self.assertEqual(read_tree(serial), read_tree(pipelined))
+
+    def test_pipelined_failures_are_reported_per_file(self):
+        write_file(os.path.join(self.content, "broken", "index.md"), "no title")
+        dest = os.path.join(self.root, "docs")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            with self.assertRaises(Exception) as cm:
+                generate_pages_pipelined(self.content, self.template, dest, "/")
+        self.assertEqual(str(cm.exception), "1 of 9 pages failed to generate")
+        self.assertIn("broken", output.getvalue())
+        self.assertEqual(len(read_tree(dest)), 8)
+
+
+class TestWriteIfChanged(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        self.dest = os.path.join(self.root, "docs")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        for i in range(4):
+            write_file(
+                os.path.join(self.content, f"page{i}", "index.md"),
+                f"# Page {i}\n\nText of page {i}.",
+            )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, build_pages, **kwargs):
+        changed_files = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_pages(
+                self.content,
+                self.template,
+                self.dest,
+                "/",
+                changed_files=changed_files,
+                **kwargs,
+            )
+        return sorted(changed_files)
+
+    def test_write_text_file_if_changed(self):
+        path = os.path.join(self.root, "page.html")
+        self.assertTrue(write_text_file_if_changed(path, "<p>one</p>"))
+        os.utime(path, ns=(0, 0))
+        self.assertFalse(write_text_file_if_changed(path, "<p>one</p>"))
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+        self.assertTrue(write_text_file_if_changed(path, "<p>two</p>"))
+        with open(path) as file:
+            self.assertEqual(file.read(), "<p>two</p>")
+        self.assertFalse(os.path.exists(f"{path}.tmp"))
+
+    def test_write_text_file_writes_the_same_bytes(self):
+        path = os.path.join(self.root, "page.html")
+        text = "<p>café</p>\n<p>naïve</p>\n"
+        write_text_file(path, text)
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), text.encode("utf-8"))
+        self.assertFalse(write_text_file_if_changed(path, text))
+
+    def test_only_changed_pages_are_written(self):
+        for build_pages, kwargs in [
+            (generate_pages_recursive, {}),
+            (generate_pages_pipelined, {}),
+            (generate_pages_parallel, {"jobs": 2}),
+        ]:
+            self.assertEqual(len(self.build(build_pages, **kwargs)), 4)
+            self.assertEqual(self.build(build_pages, **kwargs), [])
+
+            write_file(
+                os.path.join(self.content, "page2", "index.md"),
+                f"# Page 2\n\nNew for {build_pages.__name__}",
+            )
+            self.assertEqual(
+                self.build(build_pages, **kwargs),
+                [os.path.join(self.dest, "page2", "index.html")],
+            )
+            shutil.rmtree(self.dest)
+
+    def test_streamed_pages(self):
+        with mock.patch.object(generate_page_module, "STREAMING_THRESHOLD", 10):
+            self.assertEqual(len(self.build(generate_pages_recursive)), 4)
+            self.assertEqual(self.build(generate_pages_recursive), [])
+        self.assertEqual(len(read_tree(self.dest)), 4)
+
+
+class TestMappedLines(unittest.TestCase):
+    def test_matches_text_mode_lines(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "page.md")
+            for text in [
+                "",
+                "one line",
+                "# Title\n\npara one\nmore\n\n\n\n- item\n",
+                "\n\nleading and trailing blanks\n\n",
+                "caf\u00e9 \u2014 \u65e5\u672c\n\n\u00fcber\n",
+                "windows\r\nlines\r\n\r\nand\rold mac\r",
+            ]:
+                with open(path, "w", newline="") as file:
+                    file.write(text)
+                with open(path) as file:
+                    expected = [line.removesuffix("\n") for line in file]
+                self.assertEqual(list(iter_mapped_lines(path)), expected, repr(text))
+                # a block at a time
+                with mock.patch.object(generate_page_module, "MAPPED_CHUNK_SIZE", 0):
+                    self.assertEqual(list(iter_mapped_lines(path)), expected)
+
+
+class TestStreamingPage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.template = os.path.join(self.root, "template.html")
+        write_file(
+            self.template,
+            '<title>{{ Title }}</title><link href="/index.css">{{ Content }}',
+        )
+        self.source = os.path.join(self.root, "index.md")
+        write_file(
+            self.source,
+            "Intro with ![img](/a.png)\n\n# The Title\n\n"
+            "```\ncode\nmore\n```\n\n- [one](/one)\n- two\n\n"
+            "> quoted\n> text\n",
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_streaming_matches_in_memory_page(self):
+        in_memory = os.path.join(self.root, "memory", "index.html")
+        streamed = os.path.join(self.root, "stream", "index.html")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_page(self.source, self.template, in_memory, "/site/")
+        generate_page_streaming(self.source, self.template, streamed, "/site/")
+        with open(in_memory) as expected, open(streamed) as actual:
+            self.assertEqual(actual.read(), expected.read())
+
+    def test_streaming_and_in_memory_titles_agree(self):
+        write_file(self.source, "```\n# not a title\n```\n\n# Real Title\n")
+        in_memory = os.path.join(self.root, "memory", "index.html")
+        streamed = os.path.join(self.root, "stream", "index.html")
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, expected_metadata = generate_page(
+                self.source, self.template, in_memory, "/"
+            )
+        _, metadata = generate_page_streaming(self.source, self.template, streamed, "/")
+        self.assertEqual(expected_metadata["title"], "Real Title")
+        self.assertEqual(metadata["title"], "Real Title")
+        with open(in_memory) as expected, open(streamed) as actual:
+            self.assertEqual(actual.read(), expected.read())
+
+    def test_streaming_requires_title(self):
+        write_file(self.source, "no title")
+        with self.assertRaises(Exception) as cm:
+            generate_page_streaming(
+                self.source, self.template, os.path.join(self.root, "x.html"), "/"
+            )
+        self.assertEqual(str(cm.exception), "no title found")
+
+    def test_streaming_with_front_matter_matches_in_memory_page(self):
+        with open(self.source) as source:
+            markdown = source.read()
+        write_file(self.source, f"---\ntags: [a]\n---\n{markdown}")
+        in_memory = os.path.join(self.root, "memory", "index.html")
+        streamed = os.path.join(self.root, "stream", "index.html")
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, expected_metadata = generate_page(
+                self.source, self.template, in_memory, "/"
+            )
+        _, metadata = generate_page_streaming(self.source, self.template, streamed, "/")
+        self.assertEqual(metadata, expected_metadata)
+        self.assertEqual(metadata["title"], "The Title")
+        with open(in_memory) as expected, open(streamed) as actual:
+            self.assertEqual(actual.read(), expected.read())
+
+
+class TestPageIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        write_file(
+            os.path.join(self.content, "blog", "post", "index.md"),
+            "---\ntitle: Front Title\ndate: 2024-01-02\ntags: [a, b]\n"
+            "draft: true\n---\n# Heading Title\n\nText",
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, build_pages, dest, **kwargs):
+        page_index = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_pages(
+                self.content,
+                self.template,
+                os.path.join(self.root, dest),
+                "/",
+                page_index=page_index,
+                **kwargs,
+            )
+        return {
+            os.path.relpath(dest_path, os.path.join(self.root, dest)): metadata
+            for dest_path, metadata in page_index.items()
+        }
+
+    def test_index_is_collected_during_the_build(self):
+        page_index = self.build(generate_pages_recursive, "docs")
+        self.assertEqual(page_index["index.html"]["title"], "Home")
+        post = page_index[os.path.join("blog", "post", "index.html")]
+        self.assertEqual(post["title"], "Front Title")
+        self.assertEqual(post["date"], "2024-01-02")
+        self.assertEqual(post["tags"], ["a", "b"])
+        self.assertTrue(post["draft"])
+        self.assertEqual(
+            post["source"], os.path.join(self.content, "blog", "post", "index.md")
+        )
+
+        with open(os.path.join(self.root, "docs", "blog", "post", "index.html")) as f:
+            html = f.read()
+        self.assertEqual(
+            html,
+            "<title>Front Title</title><div><h1>Heading Title</h1><p>Text</p></div>",
+        )
+
+    def test_every_build_mode_collects_the_same_index(self):
+        expected = self.build(generate_pages_recursive, "serial")
+        self.assertEqual(self.build(generate_pages_pipelined, "pipelined"), expected)
+        self.assertEqual(
+            self.build(generate_pages_parallel, "parallel", jobs=2), expected
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, write_html
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -37,6 +38,16 @@ class TestHTMLNode(unittest.TestCase):
         expected = ' href="https://example.com" target="_blank"'
         self.assertEqual(node.props_to_html(), expected)
 
+    def test_nodes_have_no_instance_dict(self):
+        for node in [
+            HTMLNode("p", "text"),
+            LeafNode("a", "link", {"href": "/"}),
+            ParentNode("div", [LeafNode(None, "x")]),
+        ]:
+            self.assertFalse(hasattr(node, "__dict__"))
+            with self.assertRaises(AttributeError):
+                node.extra = 1
+
 
 class TestLeafNode(unittest.TestCase):
     def test_leaf_to_html_p(self):
@@ -169,5 +180,44 @@ class TestParentNode(unittest.TestCase):
         )
 
 
+class TestWriteHTML(unittest.TestCase):
+    def test_streams_same_output_as_to_html(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode(None, "a "), LeafNode("b", "bold")]),
+                ParentNode("ul", [ParentNode("li", [LeafNode("i", "x")])]),
+                LeafNode("a", "link", {"href": "/x"}),
+            ],
+            {"class": "box"},
+        )
+        out = io.StringIO()
+        write_html(node, out)
+        self.assertEqual(
+            out.getvalue(),
+            '<div class="box"><p>a <b>bold</b></p><ul><li><i>x</i></li></ul>'
+            '<a href="/x">link</a></div>',
+        )
+        self.assertEqual(out.getvalue(), node.to_html())
+
+    def test_leaf_root(self):
+        out = io.StringIO()
+        write_html(LeafNode("b", "x"), out)
+        self.assertEqual(out.getvalue(), "<b>x</b>")
+
+    def test_deep_nesting_does_not_recurse(self):
+        node = LeafNode(None, "x")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertEqual(html, "<span>" * 5000 + "x" + "</span>" * 5000)
+
+    def test_error_in_child_raises(self):
+        node = ParentNode("div", [LeafNode("b", "ok"), ParentNode("p", [])])
+        with self.assertRaises(ValueError) as cm:
+            write_html(node, io.StringIO())
+        self.assertEqual(str(cm.exception), "all parent nodes must have children")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,3 +1,4 @@
+import random
 import unittest
 
 from inline_markdown import (
@@ -222,6 +223,91 @@ class TestTextToTextnode(unittest.TestCase):
         ]
         self.assertEqual(textnodes, expected)
 
+    def test_empty_text(self):
+        self.assertEqual(text_to_textnodes(""), [])
+
+    def test_empty_spans_are_dropped(self):
+        self.assertEqual(
+            text_to_textnodes("a****b"),
+            [TextNode("a", TextType.TEXT), TextNode("b", TextType.TEXT)],
+        )
+
+    def test_delimiters_inside_bold_are_literal(self):
+        self.assertEqual(
+            text_to_textnodes("**a_b `c`**"),
+            [TextNode("a_b `c`", TextType.BOLD)],
+        )
+
+    def test_unclosed_delimiter_raises(self):
+        with self.assertRaises(Exception) as cm:
+            text_to_textnodes("a **b")
+        self.assertEqual(str(cm.exception), "closing delimeter missing")
+
+    def test_outranking_delimiter_inside_span_raises(self):
+        with self.assertRaises(Exception) as cm:
+            text_to_textnodes("`snake_case_name`")
+        self.assertEqual(str(cm.exception), "closing delimeter missing")
+
+
+def chained_text_to_textnodes(text):
+    # the original five-pass pipeline, kept as the reference behaviour
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+
+class TestTokenizerMatchesChainedPasses(unittest.TestCase):
+    PIECES = [
+        "a",
+        " ",
+        "word",
+        "**",
+        "*",
+        "_",
+        "`",
+        "!",
+        "[x](u)",
+        "![alt](src.png)",
+        "[",
+        "]",
+        "(",
+        ")",
+        "](",
+    ]
+
+    def assert_same(self, text):
+        try:
+            expected = chained_text_to_textnodes(text)
+        except Exception as error:
+            with self.assertRaises(Exception, msg=text) as cm:
+                text_to_textnodes(text)
+            self.assertEqual(str(cm.exception), str(error), msg=text)
+            return
+        self.assertEqual(text_to_textnodes(text), expected, msg=text)
+
+    def test_known_cases(self):
+        for text in [
+            "plain",
+            "***a***",
+            "_a*_**b**",
+            "[a ![b](c)](d)",
+            "![a](b) [a](b)",
+            "!**b**[x](y)",
+            "`a_b` and _c_",
+            "_x `y_ z`",
+            "a **b [l](u) c** d",
+        ]:
+            self.assert_same(text)
+
+    def test_random_inputs(self):
+        rng = random.Random(1234)
+        for _ in range(3000):
+            text = "".join(rng.choice(self.PIECES) for _ in range(rng.randint(0, 12)))
+            self.assert_same(text)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,8 +1,18 @@
+import io
+import re
 import unittest
 from markdown_blocks import (
+    extract_bullet,
+    extract_heading,
+    extract_number,
+    extract_quote,
     markdown_to_blocks,
     block_to_block_type,
+    block_lines_to_block_type,
+    iter_block_lines,
+    markdown_to_html,
     markdown_to_html_node,
+    write_markdown_html,
     BlockType,
 )
 
@@ -57,6 +67,41 @@ Second paragraph
             ["line 1\nline 2", "last block"],
         )
 
+    def test_whitespace_only_block_is_dropped(self):
+        md = "para 1\n\n   \n\npara 2"
+        self.assertEqual(markdown_to_blocks(md), ["para 1", "para 2"])
+
+
+class TestIterBlockLines(unittest.TestCase):
+    def test_yields_lines_per_block(self):
+        lines = ["# Title", "", "line 1", "line 2", "", "", "- item"]
+        self.assertEqual(
+            list(iter_block_lines(lines)),
+            [["# Title"], ["line 1", "line 2"], ["- item"]],
+        )
+
+    def test_strips_block_edges_only(self):
+        lines = ["  ", "  first  ", "  middle  ", "  last  ", " "]
+        self.assertEqual(
+            list(iter_block_lines(lines)),
+            [["first  ", "  middle  ", "  last"]],
+        )
+
+    def test_accepts_any_iterable(self):
+        lines = iter(["a", "", "b"])
+        self.assertEqual(list(iter_block_lines(lines)), [["a"], ["b"]])
+
+    def test_block_type_from_lines(self):
+        self.assertEqual(
+            block_lines_to_block_type(["```", "code", "```"]), BlockType.CODE
+        )
+        self.assertEqual(
+            block_lines_to_block_type(["1. one", "2. two"]), BlockType.ORDERED_LIST
+        )
+        self.assertEqual(
+            block_lines_to_block_type(["- one", "two"]), BlockType.PARAGRAPH
+        )
+
 
 class TestBlockToBlockType(unittest.TestCase):
     # --- Headings ---
@@ -125,7 +170,7 @@ class TestBlockToBlockType(unittest.TestCase):
         self.assertEqual(block_to_block_type("Just some text."), BlockType.PARAGRAPH)
 
 
-class TestMarkdownToBlocks(unittest.TestCase):
+class TestMarkdownToHTMLNode(unittest.TestCase):
 
     def test_paragraph(self):
         md = """
@@ -226,5 +271,87 @@ the **same** even with inline stuff
         )
 
 
+class TestWriteMarkdownHTML(unittest.TestCase):
+    def test_matches_markdown_to_html_node(self):
+        md = "# Title\n\nSome **bold** text\n\n- a\n- b\n\n```\ncode\n```\n"
+        out = io.StringIO()
+        write_markdown_html(iter(md.split("\n")), out)
+        self.assertEqual(out.getvalue(), markdown_to_html_node(md).to_html())
+
+    def test_empty_document_raises(self):
+        with self.assertRaises(ValueError) as cm:
+            write_markdown_html(["", "  "], io.StringIO())
+        self.assertEqual(str(cm.exception), "all parent nodes must have children")
+
+
+class TestMarkdownToHTML(unittest.TestCase):
+    def test_matches_node_tree_for_every_block_type(self):
+        md = """
+# Heading with `code`
+
+Paragraph with **bold**, _italic_, a [link](https://example.com)
+and an ![image](/img.png).
+
+```
+def f():
+    return 1
+```
+
+> quoted **text**
+> on two lines
+
+- item _one_
+- item [two](/two)
+
+1. first
+2. second ![pic](/pic.png)
+"""
+        self.assertEqual(markdown_to_html(md), markdown_to_html_node(md).to_html())
+
+    def test_empty_inline_content_raises_like_the_tree(self):
+        md = "- a\n- \n- b"
+        with self.assertRaises(ValueError) as cm:
+            markdown_to_html_node(md).to_html()
+        with self.assertRaises(ValueError) as fast_cm:
+            markdown_to_html(md)
+        self.assertEqual(str(fast_cm.exception), str(cm.exception))
+
+
+class TestExtractMarkers(unittest.TestCase):
+    # the extract_* helpers used to be re.sub calls on pattern strings
+    samples = [
+        "",
+        "- item",
+        "-item",
+        "-- item",
+        "> quote",
+        ">quote ",
+        "> ",
+        "1. one",
+        "12. twelve",
+        "1.one",
+        "². superscript",
+        "text - not a marker",
+        "## heading",
+        "####### seven",
+    ]
+
+    def test_extract_bullet(self):
+        for text in self.samples:
+            self.assertEqual(extract_bullet(text), re.sub(r"^- ", "", text), text)
+
+    def test_extract_number(self):
+        for text in self.samples:
+            self.assertEqual(extract_number(text), re.sub(r"^\d+\. ", "", text), text)
+
+    def test_extract_quote(self):
+        for text in self.samples:
+            self.assertEqual(extract_quote(text), re.sub(r"^>", "", text).strip(), text)
+
+    def test_extract_heading(self):
+        self.assertEqual(extract_heading("## heading"), (2, "heading"))
+        self.assertEqual(extract_heading("####### seven"), (6, "seven"))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,42 @@
+import json
+import os
+import tempfile
+import unittest
+
+from page_index import PAGE_INDEX_VERSION, load_page_index, save_page_index
+
+
+class TestPageIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.tmp.name, ".build", "pages.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        page_index = {
+            "docs/b/index.html": {"title": "B", "tags": ["x"]},
+            "docs/a/index.html": {"title": "A", "tags": []},
+        }
+        save_page_index(page_index, self.index_path)
+        self.assertEqual(load_page_index(self.index_path), page_index)
+
+    def test_missing_index_is_empty(self):
+        self.assertEqual(load_page_index(self.index_path), {})
+
+    def test_corrupt_or_old_index_is_empty(self):
+        os.makedirs(os.path.dirname(self.index_path))
+        with open(self.index_path, "w") as index_file:
+            index_file.write("{not json")
+        self.assertEqual(load_page_index(self.index_path), {})
+
+        with open(self.index_path, "w") as index_file:
+            json.dump(
+                {"version": PAGE_INDEX_VERSION + 1, "pages": {"a": {}}}, index_file
+            )
+        self.assertEqual(load_page_index(self.index_path), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import contextlib
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from fixtures import write_file
+from generate_page import generate_pages_recursive
+from precompress import PRECOMPRESS_MANIFEST_NAME, Precompressor
+
+
+class TestPrecompressor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.page = os.path.join(self.docs, "blog", "index.html")
+        write_file(self.page, "<p>a page worth compressing</p>\n" * 100)
+        write_file(os.path.join(self.docs, "index.css"), "p { margin: 0 }\n" * 20)
+        write_file(os.path.join(self.docs, "image.png"), "png " * 1000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def precompress(self, changed_files=None, threshold=1024):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            files = Precompressor(self.docs, threshold).finish(changed_files)
+        return files, output.getvalue()
+
+    def read_manifest(self):
+        with open(os.path.join(self.docs, PRECOMPRESS_MANIFEST_NAME)) as file:
+            return json.load(file)["files"]
+
+    def test_large_text_outputs_get_a_gzip_sibling(self):
+        files, _ = self.precompress()
+        self.assertEqual(list(files), ["/blog/index.html"])
+        self.assertEqual(self.read_manifest(), files)
+        entry = files["/blog/index.html"]
+        self.assertEqual(entry["gzip"], "/blog/index.html.gz")
+        with open(self.page, "rb") as page, gzip.open(f"{self.page}.gz") as sibling:
+            self.assertEqual(sibling.read(), page.read())
+        self.assertEqual(entry["gzip_size"], os.path.getsize(f"{self.page}.gz"))
+        # too small, and not text
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "image.png.gz")))
+
+    def test_threshold(self):
+        files, _ = self.precompress(threshold=1)
+        self.assertEqual(sorted(files), ["/blog/index.html", "/index.css"])
+        changed_files = []
+        files, _ = self.precompress(changed_files, threshold=100000)
+        self.assertEqual(files, {})
+        self.assertIn(f"{self.page}.gz", changed_files)
+        self.assertFalse(os.path.exists(f"{self.page}.gz"))
+
+    def test_incompressible_output_gets_no_sibling(self):
+        with open(os.path.join(self.docs, "noise.txt"), "wb") as file:
+            file.write(os.urandom(4096))
+        files, _ = self.precompress()
+        self.assertNotIn("/noise.txt", files)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "noise.txt.gz")))
+
+    def test_unchanged_outputs_are_skipped(self):
+        changed_files = []
+        self.precompress(changed_files)
+        self.assertEqual(
+            sorted(changed_files),
+            [f"{self.page}.gz", os.path.join(self.docs, PRECOMPRESS_MANIFEST_NAME)],
+        )
+        mtime = os.stat(f"{self.page}.gz").st_mtime_ns
+
+        changed_files = []
+        _, output = self.precompress(changed_files)
+        self.assertIn("precompressed 0 files, 1 unchanged", output)
+        self.assertEqual(changed_files, [])
+        self.assertEqual(os.stat(f"{self.page}.gz").st_mtime_ns, mtime)
+
+    def test_changed_output_is_compressed_again(self):
+        self.precompress()
+        write_file(self.page, "<p>new content</p>\n" * 100)
+        _, output = self.precompress()
+        self.assertIn("precompressed 1 files, 0 unchanged", output)
+        with gzip.open(f"{self.page}.gz") as sibling:
+            self.assertEqual(sibling.read(), b"<p>new content</p>\n" * 100)
+
+    def test_sibling_of_removed_output_is_deleted(self):
+        self.precompress()
+        os.remove(self.page)
+        changed_files = []
+        files, _ = self.precompress(changed_files)
+        self.assertEqual(files, {})
+        self.assertIn(f"{self.page}.gz", changed_files)
+        self.assertFalse(os.path.exists(f"{self.page}.gz"))
+
+    def test_pages_are_submitted_while_they_render(self):
+        root = self.tmp.name
+        write_file(os.path.join(root, "template.html"), "{{ Content }}")
+        write_file(
+            os.path.join(root, "content", "post", "index.md"),
+            "# Post\n\n" + "A paragraph of the post.\n\n" * 100,
+        )
+        precompressor = Precompressor(self.docs)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                os.path.join(root, "content"),
+                os.path.join(root, "template.html"),
+                self.docs,
+                "/",
+                precompressor=precompressor,
+            )
+            page = os.path.join(self.docs, "post", "index.html")
+            self.assertIn(page, precompressor.futures)
+            files = precompressor.finish()
+        self.assertEqual(sorted(files), ["/blog/index.html", "/post/index.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
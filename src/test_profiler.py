@@ -0,0 +1,113 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import generate_page
+import markdown_blocks
+from fixtures import write_file
+from profiler import BuildProfiler, format_report, write_report
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        self.dest = os.path.join(self.root, "docs")
+        write_file(
+            self.template,
+            "<title>{{ Title }}</title><body>{{ Content }}</body>",
+        )
+        write_file(
+            os.path.join(self.content, "index.md"),
+            "# Home\n\nSome **bold** text\n\n- one\n- two",
+        )
+        write_file(
+            os.path.join(self.content, "blog", "post.md"),
+            "# Post\n\n> a quote\n\n```\ncode\n```",
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, profiler):
+        profiler.install()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_page.generate_pages_recursive(
+                    self.content, self.template, self.dest, "/"
+                )
+        finally:
+            profiler.uninstall()
+
+    def test_records_every_stage(self):
+        profiler = BuildProfiler()
+        self.build(profiler)
+        report = profiler.report()
+
+        self.assertEqual(report["pages"], 2)
+        for stage in [
+            "read",
+            "markdown_to_blocks",
+            "block_to_block_type",
+            "text_to_textnodes",
+            "to_html",
+            "write",
+        ]:
+            self.assertGreater(report["stages"][stage]["calls"], 0, stage)
+        self.assertEqual(report["stages"]["read"]["calls"], 2)
+
+        total_read = sum(
+            os.path.getsize(os.path.join(directory, name))
+            for directory, _, names in os.walk(self.content)
+            for name in names
+        )
+        self.assertEqual(report["bytes_read"], total_read)
+        self.assertGreater(report["bytes_written"], 0)
+
+    def test_slowest_pages_are_limited(self):
+        profiler = BuildProfiler()
+        self.build(profiler)
+        report = profiler.report(top=1)
+        self.assertEqual(len(report["slowest_pages"]), 1)
+        self.assertIn("total", report["slowest_pages"][0]["stages"])
+
+    def test_uninstall_restores_functions(self):
+        originals = (
+            markdown_blocks.iter_block_lines,
+            markdown_blocks.text_to_textnodes,
+            generate_page.generate_page,
+            generate_page.read_text_file,
+        )
+        profiler = BuildProfiler()
+        self.build(profiler)
+        self.assertEqual(
+            (
+                markdown_blocks.iter_block_lines,
+                markdown_blocks.text_to_textnodes,
+                generate_page.generate_page,
+                generate_page.read_text_file,
+            ),
+            originals,
+        )
+
+    def test_report_output(self):
+        profiler = BuildProfiler()
+        with profiler.stage("copy_files"):
+            pass
+        self.build(profiler)
+        report = profiler.report()
+        self.assertIn("copy_files", format_report(report))
+
+        report_path = os.path.join(self.root, "profile.json")
+        write_report(report, report_path)
+        with open(report_path) as report_file:
+            self.assertEqual(json.load(report_file)["pages"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
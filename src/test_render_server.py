@@ -0,0 +1,122 @@
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from block_cache import BlockCache
+from markdown_blocks import markdown_to_html_node
+from render_server import RenderClient, RenderServer, RenderSocketServer, serve_lines
+from template import Template
+
+PAGE = "# Preview\n\nSome **bold** text with a [link](/docs)\n\n- one\n- two"
+# the links are served from under the basepath of the template
+PAGE_HTML = markdown_to_html_node(PAGE).to_html().replace('href="/', 'href="/site/')
+
+
+def make_server():
+    template = Template("<title>{{ Title }}</title>{{ Content }}", "/site/")
+    return RenderServer(template, BlockCache())
+
+
+class TestRenderServer(unittest.TestCase):
+    def test_renders_markdown(self):
+        response = make_server().handle({"id": 7, "markdown": PAGE})
+        self.assertEqual(response, {"id": 7, "html": PAGE_HTML})
+        self.assertIn('href="/site/docs"', response["html"])
+
+    def test_renders_full_page(self):
+        response = make_server().handle({"markdown": PAGE, "page": True})
+        self.assertTrue(response["html"].startswith("<title>Preview</title>"))
+        self.assertIn('href="/site/docs"', response["html"])
+
+    def test_block_cache_stays_warm(self):
+        server = make_server()
+        server.handle({"markdown": PAGE})
+        server.handle({"markdown": PAGE})
+        self.assertEqual(server.block_cache.hits, 3)
+
+    def test_errors_are_returned(self):
+        server = make_server()
+        self.assertEqual(
+            server.handle({"id": 1, "markdown": "**open"}),
+            {"id": 1, "error": "closing delimeter missing"},
+        )
+        self.assertIn("markdown", server.handle({"id": 2})["error"])
+        self.assertIn("json object", server.handle([1, 2])["error"])
+        self.assertIn("invalid json", server.handle_line("{nope")["error"])
+
+
+class TestServeLines(unittest.TestCase):
+    def test_one_response_per_request_line(self):
+        requests = "\n".join(
+            [
+                json.dumps({"id": 1, "markdown": "hello"}),
+                "",
+                json.dumps({"id": 2, "markdown": "# Title", "page": True}),
+            ]
+        )
+        out = io.StringIO()
+        serve_lines(make_server(), io.StringIO(requests), out)
+        responses = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([response["id"] for response in responses], [1, 2])
+        self.assertEqual(responses[0]["html"], "<div><p>hello</p></div>")
+
+
+class TestRenderSocketServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmp.name, "render.sock")
+        self.server = RenderSocketServer(self.socket_path, make_server())
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.tmp.cleanup()
+
+    def test_client_round_trip(self):
+        with RenderClient(self.socket_path) as client:
+            for _ in range(3):
+                self.assertEqual(client.render(PAGE), PAGE_HTML)
+            self.assertIn("<title>Preview</title>", client.render(PAGE, page=True))
+            with self.assertRaises(Exception):
+                client.render("_open")
+
+    def test_concurrent_clients(self):
+        with (
+            RenderClient(self.socket_path) as first,
+            RenderClient(self.socket_path) as second,
+        ):
+            self.assertEqual(first.render("a"), second.render("a"))
+
+    def test_socket_is_removed_on_close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_stale_socket_is_replaced(self):
+        stale_path = os.path.join(self.tmp.name, "stale.sock")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+            stale.bind(stale_path)
+        server = RenderSocketServer(stale_path, make_server())
+        server.server_close()
+        self.assertFalse(os.path.exists(stale_path))
+
+    def test_other_files_are_never_replaced(self):
+        file_path = os.path.join(self.tmp.name, "notasocket.txt")
+        with open(file_path, "w") as file:
+            file.write("keep me")
+        with self.assertRaises(Exception) as cm:
+            RenderSocketServer(file_path, make_server())
+        self.assertIn("not a socket", str(cm.exception))
+        with open(file_path) as file:
+            self.assertEqual(file.read(), "keep me")
+
+
+if __name__ == "__main__":
+    unittest.main()
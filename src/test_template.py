@@ -0,0 +1,124 @@
+import io
+import unittest
+
+from template import Template, rewrite_asset_urls, rewrite_basepath
+
+
+class TestRewriteBasepath(unittest.TestCase):
+    def test_root_basepath_is_unchanged(self):
+        html = '<a href="/blog">x</a><img src="/a.png">'
+        self.assertEqual(rewrite_basepath(html, "/"), html)
+
+    def test_rewrites_href_and_src(self):
+        html = '<a href="/blog">x</a><img src="/a.png">'
+        self.assertEqual(
+            rewrite_basepath(html, "/site/"),
+            '<a href="/site/blog">x</a><img src="/site/a.png">',
+        )
+
+    def test_absolute_urls_are_unchanged(self):
+        html = '<a href="https://example.com/">x</a>'
+        self.assertEqual(rewrite_basepath(html, "/site/"), html)
+
+
+class TestRewriteAssetUrls(unittest.TestCase):
+    def test_rewrites_known_assets_only(self):
+        asset_urls = {"/index.css": "/index.0123456789.css"}
+        self.assertEqual(
+            rewrite_asset_urls(
+                '<link href="/index.css?v=1"><a href="/blog">x</a>'
+                '<img src="/index.css"><a href="https://x.com/index.css">y</a>',
+                asset_urls,
+            ),
+            '<link href="/index.0123456789.css?v=1"><a href="/blog">x</a>'
+            '<img src="/index.0123456789.css"><a href="https://x.com/index.css">y</a>',
+        )
+
+    def test_no_asset_urls_is_unchanged(self):
+        html = '<img src="/a.png">'
+        self.assertEqual(rewrite_asset_urls(html, None), html)
+        self.assertEqual(rewrite_asset_urls(html, {}), html)
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_fills_slots(self):
+        template = Template("<title>{{ Title }}</title><body>{{ Content }}</body>")
+        self.assertEqual(
+            template.render("Home", "<p>hi</p>"),
+            "<title>Home</title><body><p>hi</p></body>",
+        )
+
+    def test_literal_segments_are_rewritten_at_compile_time(self):
+        template = Template('<link href="/index.css">{{ Content }}', "/site/")
+        self.assertEqual(template.segments, ['<link href="/site/index.css">', None, ""])
+
+    def test_content_links_are_rewritten(self):
+        template = Template("{{ Content }}", "/site/")
+        self.assertEqual(
+            template.render("t", '<img src="/a.png"><a href="/b">b</a>'),
+            '<img src="/site/a.png"><a href="/site/b">b</a>',
+        )
+
+    def test_template_and_content_point_at_fingerprinted_assets(self):
+        template = Template(
+            '<link href="/index.css">{{ Content }}',
+            "/site/",
+            {"/index.css": "/index.1.css", "/a.png": "/a.2.png"},
+        )
+        self.assertEqual(
+            template.render("t", '<img src="/a.png"><a href="/b">b</a>'),
+            '<link href="/site/index.1.css"><img src="/site/a.2.png">'
+            '<a href="/site/b">b</a>',
+        )
+        out = io.StringIO()
+        template.write(
+            out, "t", lambda content_out: content_out.write('<img src="/a.png">')
+        )
+        self.assertEqual(out.getvalue(), template.render("t", '<img src="/a.png">'))
+
+    def test_repeated_slots(self):
+        template = Template("{{ Title }}|{{ Title }}|{{ Content }}")
+        self.assertEqual(template.render("T", "C"), "T|T|C")
+
+    def test_template_without_slots(self):
+        template = Template("static")
+        self.assertEqual(template.render("T", "C"), "static")
+
+    def test_render_is_repeatable(self):
+        template = Template("{{ Title }}")
+        self.assertEqual(template.render("one", ""), "one")
+        self.assertEqual(template.render("two", ""), "two")
+
+    def test_write_streams_same_page_as_render(self):
+        template = Template(
+            '<title>{{ Title }}</title><link href="/a.css">{{ Content }}', "/site/"
+        )
+
+        def write_content(out):
+            out.write('<a href="/x">')
+            out.write("x</a>")
+
+        out = io.StringIO()
+        template.write(out, "T", write_content)
+        self.assertEqual(out.getvalue(), template.render("T", '<a href="/x">x</a>'))
+
+    def test_extract_content_inverts_render(self):
+        template = Template(
+            "<title>{{ Title }}</title><main>{{ Content }}</main>\n</html>", "/site/"
+        )
+        page = template.render(
+            "<main> in the title", '<div><h1>Title</h1><a href="/x">main</a></div>'
+        )
+        self.assertEqual(
+            template.extract_content(page),
+            '<div><h1>Title</h1><a href="/site/x">main</a></div>',
+        )
+
+    def test_extract_content_of_other_page_is_none(self):
+        template = Template("<main>{{ Content }}</main>")
+        self.assertIsNone(template.extract_content("<p>not from this template</p>"))
+        self.assertIsNone(Template("{{ Title }}").extract_content("x"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,9 @@
 import unittest
 
-from textnode import TextNode, TextType, text_node_to_html_node
+from textnode import TextNode, TextType, text_node_to_html, text_node_to_html_node
 from htmlnode import LeafNode
 
+
 class TestTextNode(unittest.TestCase):
     def test_eq(self):
         node = TextNode("This is a text node", TextType.BOLD)
@@ -28,6 +29,12 @@ class TestTextNode(unittest.TestCase):
         self.assertEqual(node.url, None)
         self.assertEqual(repr(node), expected)
 
+    def test_node_has_no_instance_dict(self):
+        node = TextNode("text", TextType.TEXT)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = 1
+
 
 class TestTextNodeToHTMLNode(unittest.TestCase):
     def test_text(self):
@@ -82,5 +89,19 @@ class TestTextNodeToHTMLNode(unittest.TestCase):
         self.assertEqual(str(cm.exception), "text_type is not valid")
 
 
+class TestTextNodeToHTML(unittest.TestCase):
+    def test_matches_leaf_node_html(self):
+        for text_type in TextType:
+            node = TextNode("some text", text_type, "https://example.com")
+            self.assertEqual(
+                text_node_to_html(node), text_node_to_html_node(node).to_html()
+            )
+
+    def test_invalid_text_type_raises(self):
+        with self.assertRaises(ValueError) as cm:
+            text_node_to_html(TextNode("Oops", "bold"))
+        self.assertEqual(str(cm.exception), "text_type is not valid")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,108 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from copy_files import copy_files_parallel
+import fixtures
+from fixtures import read_file
+from generate_page import generate_pages_recursive
+from watch import DependencyGraph, Watcher
+
+
+def write_file(path, text):
+    fixtures.write_file(path, text)
+    # bump the mtime explicitly, writes within one clock tick can share it
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def test_outputs_for_input(self):
+        graph = DependencyGraph()
+        graph.add("a.html", ["a.md", "template.html"])
+        graph.add("b.html", ["b.md", "template.html"])
+        self.assertEqual(graph.outputs_for("a.md"), {"a.html"})
+        self.assertEqual(graph.outputs_for("template.html"), {"a.html", "b.html"})
+        self.assertEqual(graph.outputs_for("c.md"), set())
+
+    def test_remove_output(self):
+        graph = DependencyGraph()
+        graph.add("a.html", ["a.md", "template.html"])
+        graph.remove("a.html")
+        self.assertEqual(graph.outputs_for("template.html"), set())
+        self.assertEqual(graph.dependents, {})
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            copy_files_parallel(self.static, self.dest)
+            generate_pages_recursive(self.content, self.template, self.dest, "/")
+        self.watcher = Watcher(self.content, self.template, self.static, self.dest, "/")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def poll(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.watcher.poll()
+
+    def dest_path(self, *parts):
+        return os.path.join(self.dest, *parts)
+
+    def test_no_changes(self):
+        self.assertEqual(self.poll(), [])
+
+    def test_page_change_rebuilds_only_that_page(self):
+        write_file(os.path.join(self.content, "index.md"), "# New Home")
+        self.assertEqual(self.poll(), [self.dest_path("index.html")])
+        self.assertIn("New Home", read_file(self.dest_path("index.html")))
+        self.assertEqual(self.poll(), [])
+
+    def test_template_change_rebuilds_every_page_but_no_assets(self):
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(
+            self.poll(),
+            [self.dest_path("blog", "index.html"), self.dest_path("index.html")],
+        )
+        self.assertIn("<h1>Blog</h1>", read_file(self.dest_path("blog", "index.html")))
+
+    def test_static_change_copies_only_that_file(self):
+        write_file(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.assertEqual(self.poll(), [self.dest_path("index.css")])
+        self.assertEqual(read_file(self.dest_path("index.css")), "body { margin: 0 }")
+
+    def test_new_page_is_rendered_and_tracked(self):
+        write_file(os.path.join(self.content, "about", "index.md"), "# About")
+        self.assertEqual(self.poll(), [self.dest_path("about", "index.html")])
+        write_file(self.template, "<h2>{{ Title }}</h2>{{ Content }}")
+        self.assertIn(self.dest_path("about", "index.html"), self.poll())
+
+    def test_removed_page_deletes_output(self):
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.assertEqual(self.poll(), [self.dest_path("blog", "index.html")])
+        self.assertFalse(os.path.exists(self.dest_path("blog")))
+
+    def test_broken_page_does_not_stop_the_watcher(self):
+        write_file(os.path.join(self.content, "index.md"), "no title")
+        self.assertEqual(self.poll(), [self.dest_path("index.html")])
+        write_file(os.path.join(self.content, "index.md"), "# Fixed")
+        self.assertEqual(self.poll(), [self.dest_path("index.html")])
+        self.assertIn("Fixed", read_file(self.dest_path("index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
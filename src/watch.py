@@ -0,0 +1,180 @@
+import os
+import pathlib
+import time
+
+from build_manifest import remove_output
+from copy_files import scan_tree, transfer_file
+from generate_page import find_pages, generate_page
+from template import load_template
+
+
+# maps every input file to the output files built from it, so a change to one
+# input only rebuilds what actually depends on it
+class DependencyGraph:
+    def __init__(self):
+        self.dependents = {}
+        self.dependencies = {}
+
+    def add(self, output, inputs):
+        self.remove(output)
+        self.dependencies[output] = list(inputs)
+        for input_path in inputs:
+            self.dependents.setdefault(input_path, set()).add(output)
+
+    def remove(self, output):
+        for input_path in self.dependencies.pop(output, []):
+            outputs = self.dependents[input_path]
+            outputs.discard(output)
+            if not outputs:
+                del self.dependents[input_path]
+
+    def outputs_for(self, input_path):
+        return set(self.dependents.get(input_path, ()))
+
+    def __repr__(self):
+        return f"DependencyGraph({self.dependencies})"
+
+
+# stat every file under the watched paths, keyed by path. comparing two
+# snapshots tells which inputs were added, changed or removed
+def take_snapshot(paths):
+    snapshot = {}
+    pending = [path for path in paths if os.path.exists(path)]
+    while pending:
+        path = pending.pop()
+        if not os.path.isdir(path):
+            stat = os.stat(path)
+            snapshot[str(path)] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    pending.append(entry.path)
+                else:
+                    stat = entry.stat()
+                    snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+# rebuild outputs as their inputs change. pages depend on their markdown
+# source and the template, static files only on themselves. the initial build
+# is expected to have run already; the watcher only keeps it up to date
+class Watcher:
+    def __init__(
+        self,
+        content_dir,
+        template_path,
+        static_dir,
+        dest_dir,
+        basepath,
+        block_cache=None,
+    ):
+        # normalized so paths from find_pages, scan_tree and os.scandir agree
+        self.content_dir = os.path.normpath(content_dir)
+        self.template_path = os.path.normpath(template_path)
+        self.static_dir = os.path.normpath(static_dir)
+        self.dest_dir = os.path.normpath(dest_dir)
+        self.basepath = basepath
+        self.block_cache = block_cache
+
+        self.template = load_template(self.template_path, basepath)
+        self.graph = DependencyGraph()
+        self.pages = {}
+        self.assets = {}
+        for source_path, dest_path in find_pages(self.content_dir, self.dest_dir):
+            self.add_page(str(source_path), str(dest_path))
+        _, static_files = scan_tree(self.static_dir, self.dest_dir)
+        for source_path, dest_path, _ in static_files:
+            self.add_asset(source_path, dest_path)
+
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self):
+        return take_snapshot([self.content_dir, self.static_dir, self.template_path])
+
+    def add_page(self, source_path, dest_path):
+        self.pages[dest_path] = source_path
+        self.graph.add(dest_path, [source_path, self.template_path])
+
+    def add_asset(self, source_path, dest_path):
+        self.assets[dest_path] = source_path
+        self.graph.add(dest_path, [source_path])
+
+    # check the inputs once and rebuild whatever changed. returns the outputs
+    # that were rebuilt or removed
+    def poll(self):
+        snapshot = self.take_snapshot()
+        changed = [
+            path for path in snapshot if self.snapshot.get(path) != snapshot[path]
+        ]
+        removed = [path for path in self.snapshot if path not in snapshot]
+        self.snapshot = snapshot
+
+        rebuild = set()
+        for path in changed:
+            if path == self.template_path:
+                self.template = load_template(self.template_path, self.basepath)
+            elif path not in self.graph.dependents:
+                self.add_input(path)
+            rebuild |= self.graph.outputs_for(path)
+
+        deleted = set()
+        for path in removed:
+            if path == self.template_path:
+                print(f"template {path} was removed, pages are not rebuilt")
+                continue
+            for output in self.graph.outputs_for(path):
+                self.graph.remove(output)
+                self.pages.pop(output, None)
+                self.assets.pop(output, None)
+                if os.path.exists(output):
+                    remove_output(output, self.dest_dir)
+                deleted.add(output)
+
+        for output in sorted(rebuild - deleted):
+            try:
+                self.rebuild(output)
+            except Exception as error:
+                # keep watching, the next save will usually fix it
+                print(f"failed to rebuild {output}: {error}")
+
+        return sorted(rebuild | deleted)
+
+    def add_input(self, path):
+        relative_path = os.path.relpath(path, self.content_dir)
+        if not relative_path.startswith(os.pardir):
+            if path.endswith(".md"):
+                dest_path = pathlib.Path(self.dest_dir, relative_path)
+                self.add_page(path, str(dest_path.with_suffix(".html")))
+            return
+
+        relative_path = os.path.relpath(path, self.static_dir)
+        self.add_asset(path, os.path.join(self.dest_dir, relative_path))
+
+    def rebuild(self, output):
+        if output in self.pages:
+            generate_page(
+                self.pages[output],
+                self.template_path,
+                output,
+                self.basepath,
+                self.template,
+                self.block_cache,
+            )
+        else:
+            transfer_file(self.assets[output], output)
+
+    def run(self, interval=0.5):
+        print(
+            f"watching {self.content_dir}, {self.static_dir} and {self.template_path} for changes..."
+        )
+        try:
+            while True:
+                started = time.perf_counter()
+                outputs = self.poll()
+                if outputs:
+                    elapsed = time.perf_counter() - started
+                    print(f"updated {len(outputs)} outputs in {elapsed:.3f}s")
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("stopped watching")